@@ -0,0 +1,3 @@
+# Brute-force program compared with the solution by `gop stress brute.py`
+a, b = map(int, input().split())
+print(a + b)
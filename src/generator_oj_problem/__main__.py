@@ -1,13 +1,8 @@
-import code
-import logging
 import os
 import pathlib
-import sys
 from typing import Iterable
 
 import click
-import yaml
-from click import BadArgumentUsage, BadOptionUsage, BadParameter
 from click.exceptions import ClickException
 
 from . import __version__
@@ -59,7 +54,16 @@ def printIssues(issues: "Iterable[Issue]", final: bool = True) -> Severity:
 
 
 adapters = list(allAdapters())
-pipeline: Pipeline = buildAdapter("generic")
+adapterName: str = "generic"
+pipeline: "Pipeline | None" = None
+
+
+def getPipeline() -> Pipeline:
+    # Adapters are built on first use, so that `--help` loads nothing of them.
+    global pipeline
+    if pipeline is None:
+        pipeline = buildAdapter(adapterName)
+    return pipeline
 
 
 @click.command(cls=AliasedGroup)
@@ -67,7 +71,10 @@ pipeline: Pipeline = buildAdapter("generic")
 @click.version_option(__version__, package_name="aexpy", prog_name="aexpy", message="%(prog)s v%(version)s.")
 @click.option("-a", "--adapter", type=click.Choice(adapters, case_sensitive=False), default="generic", help="Adapter to use.")
 @click.option('-D', '--directory', type=click.Path(exists=True, file_okay=False, resolve_path=True, path_type=pathlib.Path), default=".", help="Path to working directory.")
-def main(ctx=None, adapter: str = "generic", directory: pathlib.Path = ".") -> None:
+@click.option("--profile", is_flag=True, help="Print wall time, CPU time and bytes of each stage.")
+@click.option("--profile-json", type=click.Path(dir_okay=False, resolve_path=True, path_type=pathlib.Path), default=None, help="Save stage and per-case timings to a JSON file.")
+@click.option("--profile-cprofile", type=click.Path(dir_okay=False, resolve_path=True, path_type=pathlib.Path), default=None, help="Save cProfile statistics to a file (for pstats or snakeviz).")
+def main(ctx=None, adapter: str = "generic", directory: pathlib.Path = ".", profile: bool = False, profile_json: "pathlib.Path | None" = None, profile_cprofile: "pathlib.Path | None" = None) -> None:
     """
     Generator-OJ-Problem
 
@@ -78,8 +85,36 @@ def main(ctx=None, adapter: str = "generic", directory: pathlib.Path = ".") -> N
 
     os.chdir(directory)
 
-    global pipeline
-    pipeline = buildAdapter(adapter)
+    global pipeline, adapterName
+    adapterName = adapter
+    pipeline = None
+
+    if profile or profile_json or profile_cprofile:
+        enableProfile(ctx, profile, profile_json, profile_cprofile)
+
+
+def enableProfile(ctx: click.Context, summary: bool, jsonFile: "pathlib.Path | None", cprofileFile: "pathlib.Path | None"):
+    from . import profiling
+    profiler = profiling.enable()
+
+    stats = None
+    if cprofileFile:
+        import cProfile
+        stats = cProfile.Profile()
+        stats.enable()
+
+    def report():
+        if stats is not None:
+            stats.disable()
+            stats.dump_stats(str(cprofileFile))
+        if summary and profiler.stages:
+            print("-" * 50)
+            for line in profiler.summary():
+                print(line)
+        if jsonFile:
+            profiler.dump(jsonFile)
+
+    ctx.call_on_close(report)
 
 
 @main.command()
@@ -87,42 +122,148 @@ def main(ctx=None, adapter: str = "generic", directory: pathlib.Path = ".") -> N
 @click.option("-c", "--count", default=10, help="The number of generated cases.")
 @click.option("--sample", is_flag=True, help="Generate sample cases.")
 @click.option("-r", "--rewrite", is_flag=True, help="Rewrite existed cases.")
-def generate(start: int = 0, count: int = 10, sample: bool = False, rewrite: bool = False):
+@click.option("-j", "--jobs", default=1, type=click.IntRange(min=1), help="The number of cases generated in parallel.")
+@click.option("-p", "--persistent", is_flag=True, help="Load the generator once in long-lived processes instead of once per case.")
+@click.option("--stream", is_flag=True, help="Write generated data to files directly instead of keeping them in memory.")
+@click.option("-t", "--timeout", type=click.FloatRange(min=0), default=None, help="Wall-clock timeout in seconds of each case, 0 for no limit (default: generatorTimeout in problem.yml).")
+@click.option("--cpu", type=click.FloatRange(min=0), default=None, help="CPU time limit in seconds of each case, 0 for no limit (default: generatorTime in problem.yml).")
+@click.option("--memory", type=click.FloatRange(min=0), default=None, help="Memory limit in MB of each generator, 0 for no limit (default: generatorMemory in problem.yml).")
+def generate(start: int = 0, count: int = 10, sample: bool = False, rewrite: bool = False, jobs: int = 1, persistent: bool = False, stream: bool = False, timeout: "float | None" = None, cpu: "float | None" = None, memory: "float | None" = None):
     """Generate input or output data."""
 
-    if printIssues(pipeline.generate(start, count, sample, rewrite)) == Severity.Error:
+    if printIssues(getPipeline().generate(start, count, sample, rewrite, jobs, persistent, stream, timeout, cpu, memory)) == Severity.Error:
         raise ClickException("Failed to generate.")
 
 
+@main.command()
+@click.option("-j", "--jobs", default=1, type=click.IntRange(min=1), help="The number of cases solved in parallel.")
+@click.option("-r", "--rewrite", is_flag=True, help="Rewrite existed output data.")
+@click.option("-t", "--timeout", default=10.0, type=click.FloatRange(min=0), help="Wall-clock timeout in seconds of each case, 0 for no limit.")
+def solve(jobs: int = 1, rewrite: bool = False, timeout: float = 10.0):
+    """Generate output data by running the solution on input data."""
+
+    if printIssues(getPipeline().solve(jobs, rewrite, timeout)) == Severity.Error:
+        raise ClickException("Failed to solve.")
+
+
+@main.command()
+@click.option("-r", "--repeat", default=3, type=click.IntRange(min=1), help="The number of runs on each case.")
+@click.option("-j", "--jobs", default=1, type=click.IntRange(min=1), help="The number of cases measured in parallel (less accurate).")
+def measure(repeat: int = 3, jobs: int = 1):
+    """Measure time and memory of the solution against the limits."""
+
+    if printIssues(getPipeline().measure(repeat, jobs)) == Severity.Error:
+        raise ClickException("Failed to measure.")
+
+
+@main.command()
+@click.argument("brute", type=click.Path(exists=True, dir_okay=False, resolve_path=True, path_type=pathlib.Path))
+@click.option("-c", "--count", default=1000, type=click.IntRange(min=1), help="The number of generated cases.")
+@click.option("-j", "--jobs", default=os.cpu_count() or 1, type=click.IntRange(min=1), help="The number of cases tested in parallel.")
+@click.option("--seed", type=int, default=None, help="Random seed of the first case (default: random).")
+@click.option("-t", "--timeout", default=10.0, type=click.FloatRange(min=0), help="Wall-clock timeout in seconds of the generator and of each program per case, 0 for no limit.")
+def stress(brute: pathlib.Path, count: int = 1000, jobs: int = 1, seed: "int | None" = None, timeout: float = 10.0):
+    """Compare the solution with a brute-force program BRUTE on generated cases, and save the first failed case."""
+
+    if printIssues(getPipeline().stress(brute, count, jobs, seed, timeout)) == Severity.Error:
+        raise ClickException("Failed to stress.")
+
+
 @main.command()
 def trim():
     """Trim problem data (for end-of-line LF or CRLF)."""
 
-    if printIssues(pipeline.trim()) == Severity.Error:
+    if printIssues(getPipeline().trim()) == Severity.Error:
         raise ClickException("Failed to trim.")
 
 
 @main.command()
-def pack():
+@click.option("--no-cache", is_flag=True, help="Ignore results cached from previous runs.")
+@click.option("--compress", type=click.Choice(["gzip", "zip"], case_sensitive=False), default=None, help="Compress the packed problem.")
+@click.option("-l", "--level", type=click.IntRange(0, 9), default=None, help="Compression level.")
+def pack(no_cache: bool = False, compress: "str | None" = None, level: "int | None" = None):
     """Pack the problem."""
 
-    if printIssues(pipeline.pack()) == Severity.Error:
+    if printIssues(getPipeline().pack(not no_cache, compress, level)) == Severity.Error:
         raise ClickException("Failed to pack.")
 
 
 @main.command()
-def check():
+@click.option("-j", "--jobs", default=1, type=click.IntRange(min=1), help="The number of cases checked in parallel.")
+@click.option("--no-cache", is_flag=True, help="Ignore results cached from previous runs.")
+def check(jobs: int = 1, no_cache: bool = False):
     """Check validity of the problem."""
 
-    if printIssues(pipeline.check()) == Severity.Error:
+    if printIssues(getPipeline().check(jobs, not no_cache)) == Severity.Error:
         raise ClickException("Failed to check.")
 
 
+@main.command()
+@click.argument("action", type=click.Choice(["check", "pack"], case_sensitive=False))
+@click.argument("root", type=click.Path(exists=True, file_okay=False, resolve_path=True, path_type=pathlib.Path), default=".")
+@click.option("-j", "--jobs", default=os.cpu_count() or 1, type=click.IntRange(min=1), help="The number of problems processed in parallel.")
+def batch(action: str, root: pathlib.Path = ".", jobs: int = 1):
+    """Check or pack all problems (directories with problem.yml) under ROOT."""
+
+    from .batches import discover, runBatch
+
+    roots = discover(root)
+    if not roots:
+        raise ClickException(f"No problem is found in {root}.")
+
+    names = [str(item.relative_to(root)) for item in roots]
+    width = max(len("Problem"), *map(len, names))
+    print(f"   {'Problem':<{width}}  {'Errors':>6}  {'Warnings':>8}  {'Time':>8}")
+    print("-" * (width + 32))
+
+    failed = []
+    maxLevel = Severity.Info
+    for name, result in zip(names, runBatch(adapterName, action, roots, jobs)):
+        print(f"{icons[result.level]} {name:<{width}}  {result.count(Severity.Error):>6}  {result.count(Severity.Warning):>8}  {result.elapsed:>7.2f}s")
+        maxLevel = max(maxLevel, result.level)
+        if result.level == Severity.Error:
+            failed.append((name, result))
+
+    for name, result in failed:
+        print("-" * 50)
+        print(f"{name}:")
+        printIssues((item for item in result.issues if item.level == Severity.Error), final=False)
+
+    print("-" * 50)
+    print(results[maxLevel])
+    if maxLevel == Severity.Error:
+        raise ClickException(f"Failed to {action}.")
+
+
+@main.command()
+@click.option("-c", "--cases", default=20, type=click.IntRange(min=1), help="The number of synthesized test cases.")
+@click.option("-s", "--size", default=1.0, type=click.FloatRange(min=0), help="The size of each input in MB.")
+@click.option("--crlf", is_flag=True, help="Use CRLF as the end-of-line sequence.")
+@click.option("-j", "--jobs", default=1, type=click.IntRange(min=1), help="The number of parallel jobs for stages supporting them.")
+@click.option("-p", "--persistent", is_flag=True, help="Generate with long-lived generator processes.")
+@click.option("-b", "--baseline", type=click.Path(exists=True, dir_okay=False, path_type=pathlib.Path), default=None, help="Baseline JSON to compare with.")
+@click.option("-o", "--output", type=click.Path(dir_okay=False, path_type=pathlib.Path), default=None, help="Save results to JSON.")
+@click.option("--tolerance", default=0.2, type=click.FloatRange(min=0), help="Allowed slowdown ratio against the baseline.")
+def bench(cases: int = 20, size: float = 1.0, crlf: bool = False, jobs: int = 1, persistent: bool = False, baseline: "pathlib.Path | None" = None, output: "pathlib.Path | None" = None, tolerance: float = 0.2):
+    """Benchmark generate, read, check, trim and pack on a synthesized problem."""
+
+    from .benchmarks import Benchmark
+
+    benchmark = Benchmark(cases, int(size * 1024 * 1024), crlf, jobs, persistent)
+    if printIssues(benchmark.run(), final=baseline is None) == Severity.Error:
+        raise ClickException("Failed to benchmark.")
+    if output is not None:
+        benchmark.save(output)
+    if baseline is not None:
+        print("-" * 50)
+        printIssues(benchmark.compare(baseline, tolerance))
+
+
 @main.command()
 def initialize():
     """Initialize problem working directory."""
 
-    if printIssues(pipeline.initialize()) == Severity.Error:
+    if printIssues(getPipeline().initialize()) == Severity.Error:
         raise ClickException("Failed to initialize.")
 
 
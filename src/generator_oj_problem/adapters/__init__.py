@@ -1,4 +1,5 @@
 import importlib
+from pathlib import Path
 import pkgutil
 from ..pipelines import Pipeline
 
@@ -9,7 +10,7 @@ def all():
             yield item.name
 
 
-def build(adapter: str) -> Pipeline:
+def build(adapter: str, root: "Path | None" = None) -> Pipeline:
     try:
         module = importlib.import_module(f".{adapter}", __package__)
     except ImportError:
@@ -22,4 +23,4 @@ def build(adapter: str) -> Pipeline:
     checker = (getattr(module, "getChecker", None) or generic.getChecker)()
     packer = (getattr(module, "getPacker", None) or generic.getPacker)()
 
-    return Pipeline(initializer, loader, checker, packer)
+    return Pipeline(initializer, loader, checker, packer, root)
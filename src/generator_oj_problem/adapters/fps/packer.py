@@ -1,131 +1,151 @@
 from datetime import datetime
+from functools import lru_cache
 from glob import glob
+import hashlib
+import io
 import os
 from pathlib import Path
-from typing import Iterable
+from typing import Dict, Iterable, Set
 from generator_oj_problem.models import Issue, Problem, Severity, TestCase
 from generator_oj_problem.pipelines import Reader, Packer
 from generator_oj_problem import __version__
-from yaml import safe_load
-from xml.etree.ElementTree import Element, ElementTree, SubElement
-from xml.dom.minidom import Document
-import mistune
+from generator_oj_problem.profiling import fileSize, stage
+from .writer import FpsWriter, normalizedLines
+
+
+MARKDOWN_PLUGINS = ["url", "task_lists", "def_list", "abbr"]
+
+
+@lru_cache(maxsize=None)
+def getMarkdown():
+    import mistune
+    return mistune.create_markdown(plugins=MARKDOWN_PLUGINS)
 
 
 class Fps(Packer):
-    def markdown(self, content: str):
-        md = mistune.create_markdown(
-            plugins=["url", "task_lists", "def_list", "abbr"])
-        return md(content)
+    def __init__(self) -> None:
+        super().__init__()
+        # Rendered HTML, keyed by the hash of markdown content.
+        self.rendered: "Dict[str, str]" = {}
+        self.cache: "Path | None" = None
+        # Keys rendered by the current pack, the other cached files are stale.
+        self.used: "Set[str]" = set()
 
-    def pack(self, reader: Reader, dist: Path) -> "Iterable[Issue]":
+    def markdown(self, content: str):
+        import mistune
+        key = hashlib.sha256("\0".join(
+            [mistune.__version__, *MARKDOWN_PLUGINS, content]).encode("utf-8")).hexdigest()
+        self.used.add(key)
+        html = self.rendered.get(key)
+        if html is not None:
+            return html
+        file = self.cache / f"{key}.html" if self.cache else None
+        if file is not None and file.is_file():
+            html = file.read_text(encoding="utf-8")
+        else:
+            with stage("pack/markdown"):
+                html = getMarkdown()(content)
+            if file is not None:
+                try:
+                    file.parent.mkdir(parents=True, exist_ok=True)
+                    file.write_text(html, encoding="utf-8")
+                except OSError:
+                    pass
+        self.rendered[key] = html
+        return html
+
+    def prune(self):
+        if self.cache is None or not self.cache.is_dir():
+            return
+        for file in self.cache.glob("*.html"):
+            if file.stem not in self.used:
+                try:
+                    os.remove(file)
+                except OSError:
+                    pass
+
+    def pack(self, reader: Reader, dist: Path, compression: "str | None" = None, level: "int | None" = None) -> "Iterable[Issue]":
+        self.cache = dist / ".gop-cache" / "markdown"
+        self.used = set()
         problem = Problem()
         print("Load problem...")
         yield from reader.load(problem)
 
-        doc = Document()
-
-        root = doc.createElement("fps")
-        doc.appendChild(root)
-        root.setAttribute("url", "https://github.com/zhblue/freeproblemset/")
-        root.setAttribute("version", "1.2")
-
-        gen = doc.createElement("generator")
-        root.appendChild(gen)
-        gen.setAttribute("name", "HUSTOJ")
-        gen.setAttribute("url", "https://github.com/zhblue/hustoj/")
+        try:
+            if compression == "gzip":
+                import gzip
+                fp = dist / "fps.xml.gz"
+                with gzip.open(fp, "wt", encoding="utf-8", compresslevel=9 if level is None else level) as f:
+                    self._write(FpsWriter(f), reader, problem)
+            elif compression == "zip":
+                from zipfile import ZIP_DEFLATED, ZipFile
+                fp = dist / "fps.zip"
+                with ZipFile(fp, "w", ZIP_DEFLATED, compresslevel=level) as archive:
+                    with io.TextIOWrapper(archive.open("fps.xml", "w", force_zip64=True), encoding="utf-8") as f:
+                        self._write(FpsWriter(f), reader, problem)
+            else:
+                fp = dist / "fps.xml"
+                with open(fp, "w", encoding="utf-8") as f:
+                    self._write(FpsWriter(f), reader, problem)
+            with stage("pack/save") as usage:
+                usage.written = fileSize(fp)
+            self.prune()
+            yield Issue(f"Saved to {fp}.")
+        except Exception as ex:
+            yield Issue(f"Failed to save: {ex}", Severity.Error)
 
-        item = doc.createElement("item")
-        root.appendChild(item)
+    def _write(self, doc: FpsWriter, reader: Reader, problem: Problem):
+        # Elements are written as soon as they are ready, so that test data are never held all at once.
+        doc.declaration()
+        doc.start("fps", {"url": "https://github.com/zhblue/freeproblemset/",
+                          "version": "1.2"})
+        doc.empty("generator", {"name": "HUSTOJ",
+                                "url": "https://github.com/zhblue/hustoj/"})
+        doc.start("item")
 
         print("Pack description...")
 
-        sub = doc.createElement("title")
-        item.appendChild(sub)
-        sub.appendChild(doc.createCDATASection(problem.name))
-
-        sub = doc.createElement("time_limit")
-        item.appendChild(sub)
-        sub.setAttribute("unit", "s")
-        sub.appendChild(doc.createCDATASection(str(int(problem.time))))
-
-        sub = doc.createElement("memory_limit")
-        item.appendChild(sub)
-        sub.setAttribute("unit", "mb")
-        sub.appendChild(doc.createCDATASection(str(int(problem.memory))))
-
-        sub = doc.createElement("description")
-        item.appendChild(sub)
-        sub.appendChild(doc.createCDATASection(
-            self.markdown(problem.description)))
-
-        sub = doc.createElement("input")
-        item.appendChild(sub)
-        sub.appendChild(doc.createCDATASection(self.markdown(problem.input)))
-
-        sub = doc.createElement("output")
-        item.appendChild(sub)
-        sub.appendChild(doc.createCDATASection(self.markdown(problem.output)))
+        doc.text("title", problem.name)
+        doc.text("time_limit", str(int(problem.time)), {"unit": "s"})
+        doc.text("memory_limit", str(int(problem.memory)), {"unit": "mb"})
+        doc.text("description", self.markdown(problem.description))
+        doc.text("input", self.markdown(problem.input))
+        doc.text("output", self.markdown(problem.output))
 
         print("Pack sample data...")
 
         for case in reader.samples():
             print(f"  Pack sample {case.name}...")
-            subin = doc.createElement("sample_input")
-            subin.appendChild(doc.createCDATASection(
-                "\n".join(case.input.splitlines()) + "\n"))
-
-            subout = doc.createElement("sample_output")
-            subout.appendChild(doc.createCDATASection(
-                "\n".join(case.output.splitlines()) + "\n"))
-
-            item.appendChild(subin)
-            item.appendChild(subout)
+            self._case(doc, case, "sample")
 
         print("Pack test data...")
 
         for case in reader.tests():
             print(f"  Pack test {case.name}...")
-            subin = doc.createElement("test_input")
-            subin.appendChild(doc.createCDATASection(
-                "\n".join(case.input.splitlines()) + "\n"))
-
-            subout = doc.createElement("test_output")
-            subout.appendChild(doc.createCDATASection(
-                "\n".join(case.output.splitlines()) + "\n"))
-
-            item.appendChild(subin)
-            item.appendChild(subout)
+            self._case(doc, case, "test")
 
         print("Pack extra...")
 
-        hint = f"""{problem.hint}
-
-*Generated at {datetime.now()} by [generator-oj-problem](https://github.com/StardustDL/generator-oj-problem) v{__version__}.*
+        # The footer changes on every pack, so it is rendered apart from the cached hint.
+        footer = f"""*Generated at {datetime.now()} by [generator-oj-problem](https://github.com/StardustDL/generator-oj-problem) v{__version__}.*
 """
-
-        if not hint.isspace():
-            sub = doc.createElement("hint")
-            item.appendChild(sub)
-            sub.appendChild(doc.createCDATASection(
-                self.markdown(hint)))
+        doc.text("hint", self.markdown(problem.hint) + getMarkdown()(footer))
 
         if not problem.author.isspace():
-            sub = doc.createElement("source")
-            item.appendChild(sub)
-            sub.appendChild(doc.createCDATASection(problem.author))
+            doc.text("source", problem.author)
 
         if not problem.solution.isspace():
-            sub = doc.createElement("solution")
-            item.appendChild(sub)
-            sub.setAttribute("language", problem.solutionLanguage)
-            sub.appendChild(doc.createCDATASection(problem.solution))
+            doc.text("solution", problem.solution, {
+                     "language": problem.solutionLanguage})
 
         print("Save dist...")
-        try:
-            fp = dist / "fps.xml"
-            with open(fp, "w", encoding="utf-8") as f:
-                doc.writexml(f, encoding="utf-8")
-            yield Issue(f"Saved to {fp}.")
-        except Exception as ex:
-            yield Issue(f"Failed to save: {ex}", Severity.Error)
+        doc.end("item")
+        doc.end("fps")
+
+    def _case(self, doc: FpsWriter, case: TestCase, type: str):
+        with stage(f"pack/{type}", case.name) as usage:
+            usage.read = fileSize(case.infile) + fileSize(case.outfile)
+            with case.viewInput() as raw:
+                doc.cdata(f"{type}_input", normalizedLines(raw))
+            with case.viewOutput() as raw:
+                doc.cdata(f"{type}_output", normalizedLines(raw))
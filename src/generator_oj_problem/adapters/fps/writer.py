@@ -0,0 +1,94 @@
+import codecs
+from mmap import mmap
+from typing import Dict, Iterable, TextIO
+
+
+def escapeAttribute(value: str) -> str:
+    return value.replace("&", "&amp;").replace("<", "&lt;").replace("\"", "&quot;").replace(">", "&gt;")
+
+
+class CDataWriter:
+    def __init__(self, stream: TextIO) -> None:
+        self.stream = stream
+        # Trailing "]" are held back, since they may start a "]]>" with the next chunk.
+        self.pending = ""
+
+    def write(self, text: str):
+        text = self.pending + text
+        keep = len(text) - len(text.rstrip("]"))
+        keep = min(keep, 2)
+        self.pending = text[len(text) - keep:] if keep else ""
+        text = text[:len(text) - keep]
+        self.stream.write(text.replace("]]>", "]]]]><![CDATA[>"))
+
+    def close(self):
+        self.stream.write(self.pending)
+        self.pending = ""
+
+
+# Write a FPS document element by element, in the same form as `xml.dom.minidom`.
+class FpsWriter:
+    def __init__(self, stream: TextIO) -> None:
+        self.stream = stream
+
+    def declaration(self):
+        self.stream.write('<?xml version="1.0" encoding="utf-8"?>')
+
+    def _open(self, tag: str, attributes: "Dict[str, str] | None"):
+        self.stream.write(f"<{tag}")
+        for name, value in (attributes or {}).items():
+            self.stream.write(f' {name}="{escapeAttribute(value)}"')
+
+    def start(self, tag: str, attributes: "Dict[str, str] | None" = None):
+        self._open(tag, attributes)
+        self.stream.write(">")
+
+    def end(self, tag: str):
+        self.stream.write(f"</{tag}>")
+
+    def empty(self, tag: str, attributes: "Dict[str, str] | None" = None):
+        self._open(tag, attributes)
+        self.stream.write("/>")
+
+    def cdata(self, tag: str, chunks: "Iterable[str]", attributes: "Dict[str, str] | None" = None):
+        self.start(tag, attributes)
+        self.stream.write("<![CDATA[")
+        writer = CDataWriter(self.stream)
+        for chunk in chunks:
+            writer.write(chunk)
+        writer.close()
+        self.stream.write("]]>")
+        self.end(tag)
+
+    def text(self, tag: str, text: str, attributes: "Dict[str, str] | None" = None):
+        self.cdata(tag, [text], attributes)
+
+
+# Decode UTF-8 data chunk by chunk, and yield it as `"\n".join(text.splitlines()) + "\n"`.
+def normalizedLines(raw: "bytes | mmap", chunkSize: int = 1024 * 1024) -> "Iterable[str]":
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    carry = ""
+    empty = True
+
+    def complete(text: str, final: bool):
+        nonlocal carry
+        lines = (carry + text).splitlines(keepends=True)
+        carry = ""
+        if lines and not final:
+            last = lines[-1]
+            # A line without its end, or ending with "\r" which may be followed by "\n".
+            if last.splitlines()[0] == last or last.endswith("\r"):
+                carry = lines.pop()
+        return "".join(line.splitlines()[0] + "\n" for line in lines)
+
+    for start in range(0, len(raw), chunkSize):
+        text = complete(decoder.decode(raw[start:start + chunkSize]), False)
+        if text:
+            empty = False
+            yield text
+    text = complete(decoder.decode(b"", True), True)
+    if text:
+        empty = False
+        yield text
+    if empty:
+        yield "\n"
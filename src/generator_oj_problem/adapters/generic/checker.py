@@ -1,27 +1,110 @@
+from functools import partial
 from glob import glob
+from mmap import mmap
 import os
 from pathlib import Path
-from typing import Iterable
-from generator_oj_problem.models import Issue, Problem, Severity, TestCase
+import re
+from typing import TYPE_CHECKING, Dict, Iterable, List, Tuple
+from generator_oj_problem.caches import Manifest
+from generator_oj_problem.models import Issue, Problem, Severity, TestCase, countEol
 from generator_oj_problem.pipelines import Reader, Checker
+from generator_oj_problem.profiling import fileSize, stage
 from .paths import PathBuilder
-from yaml import safe_load
-import chardet
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+CHARDET_PREFIX = 64 * 1024
+EOL_EXAMPLES = 5
+
+EOL_BAD_LF = re.compile(rb"\r")
+EOL_BAD_CRLF = re.compile(rb"(?<!\r)\n|\r(?!\n)")
+
+
+class EolStatistics:
+    def __init__(self) -> None:
+        self.lf = 0
+        self.crlf = 0
+        self.cr = 0
+        self.bad = 0
+        self.lines: "List[int]" = []
+
+
+def terminators(data: bytes) -> int:
+    # LF, CRLF and bare CR all end a line.
+    return data.count(b"\n") + data.count(b"\r") - data.count(b"\r\n")
+
+
+def scanEol(raw: "bytes | mmap", crlf: bool) -> EolStatistics:
+    result = EolStatistics()
+
+    result.lf, result.crlf, result.cr = countEol(raw)
+
+    if crlf:
+        result.bad = result.lf + result.cr
+        unterminated = len(raw) > 0 and raw[-1:] not in (b"\n", b"\r")
+        if unterminated:
+            result.bad += 1
+    else:
+        result.bad = result.crlf + result.cr
+        unterminated = False
+
+    if result.bad == 0:
+        return result
+
+    # Locate the first few offending lines only, each match ends a different line.
+    line, pos = 1, 0
+    for match in (EOL_BAD_CRLF if crlf else EOL_BAD_LF).finditer(raw):
+        line += terminators(raw[pos:match.start()])
+        pos = match.start()
+        result.lines.append(line)
+        if len(result.lines) >= EOL_EXAMPLES:
+            break
+    else:
+        if unterminated:
+            result.lines.append(line + terminators(raw[pos:]))
+    return result
+
+
+
+def _fingerprint(cache: Manifest, problem: Problem, case: TestCase) -> str:
+    return cache.fingerprint([case.infile, case.outfile], "crlf" if problem.crlf else "lf")
+
+
+def _checkTestcase(checker: "Generic", problem: Problem, type: str, cached: bool, item: "Tuple[TestCase, str | None]") -> "Tuple[List[Issue], str, Dict[str, dict]]":
+    # Workers also hash the data, so that a cold cache is filled in parallel; the file hashes are sent back.
+    case, fingerprint = item
+    files: "Dict[str, dict]" = {}
+    if cached and fingerprint is None:
+        manifest = Manifest(Path())
+        fingerprint = _fingerprint(manifest, problem, case)
+        files = manifest.files
+    return list(checker._testcase(problem, case, type)), fingerprint or "", files
 
 
 class Generic(Checker):
-    def check(self, reader: Reader) -> "Iterable[Issue]":
+    def check(self, reader: Reader, jobs: int = 1, cache: "Manifest | None" = None) -> "Iterable[Issue]":
         problem = Problem()
         print("Load problem...")
         yield from reader.load(problem)
         yield from self._metadata(problem)
         yield from self._description(problem)
-        print("Check sample cases...")
-        for case in reader.samples():
-            yield from self._testcase(problem, case, "sample")
-        print("Check test cases...")
-        for case in reader.tests():
-            yield from self._testcase(problem, case, "test")
+
+        pool = None
+        if jobs > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            pool = ProcessPoolExecutor(max_workers=jobs)
+        try:
+            print("Check sample cases...")
+            yield from self._testcases(problem, reader.samples(), "sample", pool, jobs, cache)
+            print("Check test cases...")
+            yield from self._testcases(problem, reader.tests(), "test", pool, jobs, cache)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        for file in reader.orphans():
+            yield Issue(f"The output {file} has no matching input.", Severity.Warning)
 
     def _metadata(self, problem: Problem) -> "Iterable[Issue]":
         print("Check metadata...")
@@ -47,24 +130,83 @@ class Generic(Checker):
         if problem.solution.isspace():
             yield Issue("The solution is missing.", Severity.Warning)
 
+    def _testcases(self, problem: Problem, cases: "Iterable[TestCase]", type: str, pool: "ProcessPoolExecutor | None", jobs: int, cache: "Manifest | None") -> "Iterable[Issue]":
+        cases = list(cases)
+
+        keys: "List[str]" = []
+        results: "List[List[Issue] | None]" = []
+        pending: "List[Tuple[TestCase, str | None]]" = []
+        for case in cases:
+            key = f"check/{type}/{case.name}"
+            result = None
+            fingerprint = None
+            # Only cases with a cached result are hashed here, the others are hashed when checked.
+            if cache and key in cache.results:
+                fingerprint = _fingerprint(cache, problem, case)
+                result = cache.get(key, fingerprint)
+            keys.append(key)
+            results.append(result)
+            if result is None:
+                pending.append((case, fingerprint))
+
+        if pool is None:
+            computed = (self._profiledTestcase(problem, case, type, cache, fingerprint)
+                        for case, fingerprint in pending)
+        else:
+            # Cases are sent as paths and loaded by the workers, results come back in case order.
+            # Per-case timings are not collected inside the workers.
+            chunksize = max(1, len(pending) // (jobs * 4))
+            computed = pool.map(partial(_checkTestcase, self, problem, type, cache is not None),
+                                pending, chunksize=chunksize)
+
+        for case, key, result in zip(cases, keys, results):
+            if result is None:
+                result, fingerprint, files = next(computed)
+                # Drop the decoded texts, so that only one case is held in memory at a time.
+                case.rinput = case.routput = None
+                if cache:
+                    cache.files.update(files)
+                    cache.put(key, fingerprint, result)
+            else:
+                print(f"  Check {type} case {case.name} (cached)...")
+            yield from result
+
+    def _profiledTestcase(self, problem: Problem, case: TestCase, type: str, cache: "Manifest | None", fingerprint: "str | None") -> "Tuple[List[Issue], str, Dict[str, dict]]":
+        if cache and fingerprint is None:
+            fingerprint = _fingerprint(cache, problem, case)
+        with stage(f"check/{type}", case.name) as usage:
+            usage.read = fileSize(case.infile) + fileSize(case.outfile)
+            return list(self._testcase(problem, case, type)), fingerprint or "", {}
+
+    def _encoding(self, case: TestCase, part: str, type: str) -> "Iterable[Issue]":
+        try:
+            getattr(case, part)
+        except UnicodeDecodeError as ex:
+            # Only guess the actual encoding for invalid data, and from a bounded prefix.
+            import chardet
+            with getattr(case, f"view{part.title()}")() as raw:
+                encoding = chardet.detect(
+                    raw[:CHARDET_PREFIX]).get("encoding", None)
+            yield Issue(f"The {part} of {type} {case.name} is not in UTF-8 (invalid byte at offset {ex.start}, maybe in {encoding}).", Severity.Warning)
+
     def _testcase(self, problem: Problem, case: TestCase, type: str) -> "Iterable[Issue]":
         print(f"  Check {type} case {case.name}...")
 
-        if len(case.rinput) > 0 and not chardet.detect(case.rinput).get("encoding", None) in {"utf-8", "ascii"}:
-            yield Issue(f"The input of {type} {case.name} is not in UTF-8.", Severity.Warning)
-        if len(case.routput) > 0 and not chardet.detect(case.routput).get("encoding", None) in {"utf-8", "ascii"}:
-            yield Issue(f"The output of {type} {case.name} is not in UTF-8.", Severity.Warning)
+        eolName = r"CRLF(\r\n)" if problem.crlf else r"LF(\n)"
 
-        if case.input.isspace():
-            yield Issue(f"The input of {type} {case.name} is missing.", Severity.Error)
-        if case.output.isspace():
-            yield Issue(f"The output of {type} {case.name} is missing.", Severity.Error)
+        for part in ("input", "output"):
+            with stage("check/encoding"):
+                issues = list(self._encoding(case, part, type))
+            if issues:
+                yield from issues
+                continue
 
-        eolName = r"CRLF(\r\n)" if problem.crlf else r"LF(\n)"
+            text: str = getattr(case, part)
+            if text.isspace():
+                yield Issue(f"The {part} of {type} {case.name} is missing.", Severity.Error)
 
-        for i, l in enumerate(case.input.splitlines(keepends=True)):
-            if l.endswith("\r\n") != problem.crlf:
-                yield Issue(f"The line {i+1} of {type} {case.name} input is not ended with {eolName}.", Severity.Warning)
-        for i, l in enumerate(case.output.splitlines(keepends=True)):
-            if l.endswith("\r\n") != problem.crlf:
-                yield Issue(f"The line {i+1} of {type} {case.name} output is not ended with {eolName}.", Severity.Warning)
+            with stage("check/eol"), getattr(case, f"view{part.title()}")() as raw:
+                eol = scanEol(raw, problem.crlf)
+            if eol.bad > 0:
+                lines = ", ".join(map(str, eol.lines))
+                yield Issue(f"{eol.bad} line(s) of {type} {case.name} {part} are not ended with {eolName} (LF: {eol.lf}, CRLF: {eol.crlf}, CR: {eol.cr}; first at line {lines}).", Severity.Warning)
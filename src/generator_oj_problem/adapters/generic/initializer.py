@@ -3,9 +3,7 @@ from pathlib import Path
 from typing import Iterable
 from generator_oj_problem.models import Issue, Problem, Severity
 from generator_oj_problem.pipelines import Initializer
-from generator_oj_problem.generators.processors import TestGenerator
 from .paths import PathBuilder
-from yaml import safe_dump
 
 
 class Generic(Initializer):
@@ -67,6 +65,10 @@ time: 1.0
 crlf: false
 # Programming language used by 'solution.txt'
 solutionLanguage: C++
+# Wall-clock timeout and CPU time in seconds, and memory in MB, of each generator run, 0 for no limit
+generatorTimeout: 0
+generatorTime: 0
+generatorMemory: 0
 """)
 
         if not paths.samples.exists() or paths.samples.is_file():
@@ -89,4 +91,5 @@ solutionLanguage: C++
         yield from genIO(paths.tests, "0", "2 3\n", "5\n", "test")
         yield from genIO(paths.tests, "1", "20 22\n", "42\n", "test")
 
+        from generator_oj_problem.generators.processors import TestGenerator
         yield from TestGenerator(root, Problem()).initialize()
@@ -1,11 +1,42 @@
 from glob import glob
 import os
 from pathlib import Path
-from typing import Iterable
+import re
+from typing import Dict, Iterable, List, Tuple
 from generator_oj_problem.models import Issue, Problem, Severity, TestCase
 from generator_oj_problem.pipelines import Loader, Reader
+from generator_oj_problem.profiling import profiled, stage
 from .paths import PathBuilder
-from yaml import safe_load
+
+
+def naturalKey(name: str):
+    return tuple(int(part) if part.isdigit() else part for part in re.split(r"(\d+)", name))
+
+
+class CaseIndex:
+    def __init__(self, cases: "List[Tuple[str, Path, Path | None]]", orphans: "List[Path]") -> None:
+        self.cases = cases
+        self.orphans = orphans
+
+    @classmethod
+    def scan(cls, root: Path) -> "CaseIndex":
+        inputs: "Dict[str, Path]" = {}
+        outputs: "Dict[str, Path]" = {}
+        try:
+            with os.scandir(root) as entries:
+                for entry in entries:
+                    name, ext = os.path.splitext(entry.name)
+                    if ext == ".in":
+                        inputs[name] = Path(entry.path)
+                    elif ext == ".out":
+                        outputs[name] = Path(entry.path)
+        except OSError:
+            pass
+        cases = [(name, inputs[name], outputs.get(name))
+                 for name in sorted(inputs, key=naturalKey)]
+        orphans = [outputs[name] for name in sorted(
+            outputs.keys() - inputs.keys(), key=naturalKey)]
+        return cls(cases, orphans)
 
 
 class GenericReader(Reader):
@@ -13,8 +44,12 @@ class GenericReader(Reader):
         super().__init__()
         self.root = root
         self.paths = PathBuilder(root)
+        self._indexes: "Dict[Path, CaseIndex]" = {}
 
     def load(self, problem: Problem) -> "Iterable[Issue]":
+        return profiled("load", self._load(problem))
+
+    def _load(self, problem: Problem) -> "Iterable[Issue]":
         paths = self.paths
 
         if not paths.description.exists():
@@ -46,6 +81,7 @@ class GenericReader(Reader):
             yield Issue("Metadata does NOT exist.", Severity.Warning)
         else:
             try:
+                from yaml import safe_load
                 metadata: dict = safe_load(paths.metadata.read_text())
                 problem.name = metadata.get("name", "")
                 problem.author = metadata.get("author", "")
@@ -54,20 +90,27 @@ class GenericReader(Reader):
                 problem.solutionLanguage = metadata.get(
                     "solutionLanguage", "C++")
                 problem.crlf = metadata.get("crlf", False)
+                problem.generatorTimeout = float(
+                    metadata.get("generatorTimeout", 0.0))
+                problem.generatorTime = float(
+                    metadata.get("generatorTime", 0.0))
+                problem.generatorMemory = float(
+                    metadata.get("generatorMemory", 0.0))
             except:
                 yield Issue("Metadata is in wrong format.", Severity.Error)
 
         return problem
 
+    def _getIndex(self, root: Path) -> "CaseIndex":
+        index = self._indexes.get(root)
+        if index is None:
+            with stage("index"):
+                index = self._indexes[root] = CaseIndex.scan(root)
+        return index
+
     def _getCases(self, root: Path):
-        if not root.exists() or root.is_file():
-            return
-        for infile in root.glob("*.in"):
-            case = TestCase(infile.stem, infile.read_bytes())
-            outfile = infile.with_suffix(".out")
-            if outfile.exists():
-                case.routput = outfile.read_bytes()
-            yield case
+        for name, infile, outfile in self._getIndex(root).cases:
+            yield TestCase(name, infile=infile, outfile=outfile)
 
     def samples(self) -> Iterable[TestCase]:
         return self._getCases(self.paths.samples)
@@ -75,6 +118,23 @@ class GenericReader(Reader):
     def tests(self) -> Iterable[TestCase]:
         return self._getCases(self.paths.tests)
 
+    def orphans(self) -> Iterable[Path]:
+        yield from self._getIndex(self.paths.samples).orphans
+        yield from self._getIndex(self.paths.tests).orphans
+
+    def files(self) -> Iterable[Path]:
+        paths = self.paths
+        for file in [paths.description, paths.input, paths.output, paths.hint, paths.solution, paths.metadata]:
+            if file.exists():
+                yield file
+        for root in [paths.samples, paths.tests]:
+            index = self._getIndex(root)
+            for _, infile, outfile in index.cases:
+                yield infile
+                if outfile is not None:
+                    yield outfile
+            yield from index.orphans
+
 
 class Generic(Loader):
     def build(self, root: Path) -> Reader:
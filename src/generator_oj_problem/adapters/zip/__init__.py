@@ -0,0 +1,3 @@
+def getPacker():
+    from .packer import Zip
+    return Zip()
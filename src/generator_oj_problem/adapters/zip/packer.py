@@ -0,0 +1,84 @@
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable
+from generator_oj_problem.models import Issue, Problem, Severity, TestCase
+from generator_oj_problem.pipelines import Reader, Packer
+from generator_oj_problem.profiling import fileSize, stage
+
+if TYPE_CHECKING:
+    from zipfile import ZipFile
+
+CHUNK = 1024 * 1024
+ZIP64_SIZE = (1 << 31) - 1
+
+
+class Zip(Packer):
+    def pack(self, reader: Reader, dist: Path, compression: "str | None" = None, level: "int | None" = None) -> "Iterable[Issue]":
+        problem = Problem()
+        print("Load problem...")
+        yield from reader.load(problem)
+
+        if compression not in {None, "zip"}:
+            yield Issue(f"Compression {compression} is not supported, use zip.", Severity.Warning)
+
+        from zipfile import ZIP_DEFLATED, ZipFile
+
+        fp = dist / "problem.zip"
+        try:
+            with ZipFile(fp, "w", ZIP_DEFLATED, compresslevel=level) as archive:
+                self._write(archive, reader, problem)
+            with stage("pack/save") as usage:
+                usage.written = fileSize(fp)
+            yield Issue(f"Saved to {fp}.")
+        except Exception as ex:
+            yield Issue(f"Failed to save: {ex}", Severity.Error)
+
+    def _entry(self, archive: "ZipFile", name: str, size: int):
+        # ZIP64 must be decided before streaming an entry of unknown size.
+        return archive.open(name, "w", force_zip64=size >= ZIP64_SIZE)
+
+    def _text(self, archive: "ZipFile", name: str, text: str):
+        archive.writestr(name, text.encode("utf-8"))
+
+    def _data(self, archive: "ZipFile", name: str, view):
+        with view as raw, self._entry(archive, name, len(raw)) as f:
+            for start in range(0, len(raw), CHUNK):
+                f.write(raw[start:start + CHUNK])
+
+    def _case(self, archive: "ZipFile", case: TestCase, type: str):
+        with stage(f"pack/{type}", case.name) as usage:
+            usage.read = fileSize(case.infile) + fileSize(case.outfile)
+            self._data(archive, f"{type}s/{case.name}.in", case.viewInput())
+            self._data(archive, f"{type}s/{case.name}.out", case.viewOutput())
+
+    def _write(self, archive: "ZipFile", reader: Reader, problem: Problem):
+        from yaml import safe_dump
+
+        print("Pack description...")
+
+        self._text(archive, "problem.yml", safe_dump({
+            "name": problem.name,
+            "author": problem.author,
+            "memory": problem.memory,
+            "time": problem.time,
+            "crlf": problem.crlf,
+            "solutionLanguage": problem.solutionLanguage,
+        }, allow_unicode=True, sort_keys=False))
+        self._text(archive, "description.md", problem.description)
+        self._text(archive, "input.md", problem.input)
+        self._text(archive, "output.md", problem.output)
+        self._text(archive, "hint.md", problem.hint)
+        self._text(archive, "solution.txt", problem.solution)
+
+        print("Pack sample data...")
+
+        for case in reader.samples():
+            print(f"  Pack sample {case.name}...")
+            self._case(archive, case, "sample")
+
+        print("Pack test data...")
+
+        for case in reader.tests():
+            print(f"  Pack test {case.name}...")
+            self._case(archive, case, "test")
+
+        print("Save dist...")
@@ -0,0 +1,57 @@
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+import io
+import os
+from pathlib import Path
+import time
+from typing import Iterable, List
+
+from .models import Issue, Severity
+
+
+class BatchResult:
+    def __init__(self, root: Path, issues: "List[Issue]", elapsed: float) -> None:
+        self.root = root
+        self.issues = issues
+        self.elapsed = elapsed
+
+    @property
+    def level(self) -> Severity:
+        return max((item.level for item in self.issues), default=Severity.Info)
+
+    def count(self, level: Severity) -> int:
+        return sum(1 for item in self.issues if item.level == level)
+
+
+def discover(root: Path) -> "List[Path]":
+    result = []
+    for current, dirs, files in os.walk(root):
+        if "problem.yml" in files:
+            result.append(Path(current))
+            # Samples, tests and dist of a problem are never problems.
+            dirs.clear()
+        else:
+            dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+    return sorted(result)
+
+
+def runProblem(adapter: str, action: str, root: Path) -> BatchResult:
+    from .adapters import build as buildAdapter
+
+    start = time.perf_counter()
+    # Progress messages of concurrent problems would interleave, so drop them.
+    with redirect_stdout(io.StringIO()):
+        try:
+            issues = list(getattr(buildAdapter(adapter, root), action)())
+        except Exception as ex:
+            issues = [Issue(f"Failed to {action}: {ex}", Severity.Error)]
+    return BatchResult(root, issues, time.perf_counter() - start)
+
+
+def runBatch(adapter: str, action: str, roots: "List[Path]", jobs: int = 1) -> "Iterable[BatchResult]":
+    if jobs <= 1:
+        for root in roots:
+            yield runProblem(adapter, action, root)
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            yield from pool.map(runProblem, [adapter] * len(roots), [action] * len(roots), roots)
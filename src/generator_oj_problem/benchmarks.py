@@ -0,0 +1,126 @@
+from contextlib import redirect_stdout
+import io
+import json
+import os
+from pathlib import Path
+import shutil
+import tempfile
+import time
+from typing import Callable, Dict, Iterable
+
+from .generators.limits import maxRss, resource
+from .models import Issue, Severity
+
+
+GENERATOR = """from generator_oj_problem.generators import data
+import random
+
+row = " ".join(str(random.randint(1, 10 ** 9)) for _ in range(10))
+count = max(1, {size} // (len(row) + 1))
+data.In("\\n".join([row] * count))
+data.Out(count)
+data.submit()
+"""
+
+
+def peakRss() -> "int | None":
+    # The high-water mark of the whole run, since ru_maxrss can not be reset between stages.
+    if resource is None:
+        return None
+    return max(maxRss(resource.getrusage(resource.RUSAGE_SELF)),
+               maxRss(resource.getrusage(resource.RUSAGE_CHILDREN)))
+
+
+def dataSize(root: Path) -> int:
+    return sum(file.stat().st_size for folder in (root / "samples", root / "tests") if folder.exists()
+               for file in folder.iterdir() if file.suffix in {".in", ".out"})
+
+
+class Benchmark:
+    def __init__(self, cases: int = 20, size: int = 1024 * 1024, crlf: bool = False, jobs: int = 1, persistent: bool = False) -> None:
+        self.cases = cases
+        self.size = size
+        self.crlf = crlf
+        self.jobs = jobs
+        self.persistent = persistent
+        self.results: "Dict[str, dict]" = {}
+        self.rss: "int | None" = None
+
+    @property
+    def shape(self) -> dict:
+        return {"cases": self.cases, "size": self.size, "crlf": self.crlf, "jobs": self.jobs, "persistent": self.persistent}
+
+    def _prepare(self, root: Path):
+        (root / "problem.yml").write_text(f"""name: Benchmark
+author: generator-oj-problem
+memory: 128.0
+time: 1.0
+crlf: {"true" if self.crlf else "false"}
+solutionLanguage: C++
+""", encoding="utf-8")
+        for name in ("description", "input", "output", "hint"):
+            (root / f"{name}.md").write_text(
+                f"# {name.title()}\n\nSome **markdown** for `{name}`.\n" * 20, encoding="utf-8")
+        (root / "solution.txt").write_text("int main() { return 0; }\n", encoding="utf-8")
+        (root / "generator.py").write_text(GENERATOR.format(size=self.size), encoding="utf-8")
+
+    def _measure(self, name: str, run: "Callable[[], Iterable[Issue]]", root: Path) -> "Iterable[Issue]":
+        wall, cpu = time.perf_counter(), os.times()
+        with redirect_stdout(io.StringIO()):
+            issues = list(run())
+        wall, end = time.perf_counter() - wall, os.times()
+        cpu = (end.user + end.system + end.children_user + end.children_system) - \
+            (cpu.user + cpu.system + cpu.children_user + cpu.children_system)
+        size = dataSize(root)
+
+        result = {"wall": wall, "cpu": cpu, "bytes": size,
+                  "throughput": size / wall / 1024 / 1024 if wall > 0 else 0.0}
+        self.results[name] = result
+
+        level = max((item.level for item in issues), default=Severity.Info)
+        if level == Severity.Error:
+            yield from (item for item in issues if item.level == Severity.Error)
+        yield Issue(f"{name:<8} {wall:8.3f} s wall, {cpu:8.3f} s CPU, {result['throughput']:8.2f} MB/s.", level)
+
+    def run(self) -> "Iterable[Issue]":
+        from .adapters import build as buildAdapter
+
+        root = Path(tempfile.mkdtemp(prefix="gop-bench-"))
+        try:
+            self._prepare(root)
+            pipeline = buildAdapter("fps", root)
+
+            def read():
+                reader = pipeline.loader.build(root)
+                for cases in (reader.samples(), reader.tests()):
+                    for case in cases:
+                        len(case.rinput)
+                        len(case.routput)
+                return []
+
+            yield from self._measure("generate", lambda: pipeline.generate(0, self.cases, jobs=self.jobs, persistent=self.persistent), root)
+            yield from self._measure("read", read, root)
+            yield from self._measure("check", lambda: pipeline.check(self.jobs, cache=False), root)
+            yield from self._measure("trim", pipeline.trim, root)
+            yield from self._measure("pack", lambda: pipeline.pack(cache=False), root)
+            self.rss = peakRss()
+            rss = "unknown" if self.rss is None else f"{self.rss / 1024 / 1024:.1f} MB"
+            yield Issue(f"Peak RSS of all stages {rss}.")
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+    def save(self, file: Path):
+        file.write_text(json.dumps(
+            {"shape": self.shape, "stages": self.results, "rss": self.rss}, indent=4), encoding="utf-8")
+
+    def compare(self, file: Path, tolerance: float = 0.2) -> "Iterable[Issue]":
+        baseline: dict = json.loads(file.read_text(encoding="utf-8"))
+        if baseline.get("shape") != self.shape:
+            yield Issue(f"The shape of baseline {baseline.get('shape')} differs from {self.shape}.", Severity.Warning)
+        for name, result in self.results.items():
+            base = baseline.get("stages", {}).get(name)
+            if not base or base["wall"] <= 0:
+                continue
+            ratio = result["wall"] / base["wall"]
+            message = f"{name:<8} {ratio:6.2f}x of baseline ({base['wall']:.3f} s -> {result['wall']:.3f} s)."
+            yield Issue(message, Severity.Warning if ratio > 1 + tolerance else Severity.Info)
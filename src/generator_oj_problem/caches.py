@@ -0,0 +1,88 @@
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+from . import __version__
+from .models import Issue, Severity
+
+# Bump when the checks, the packers or this format change, so that cached results are not replayed.
+REVISION = 2
+
+
+class Manifest:
+    def __init__(self, file: Path) -> None:
+        self.file = file
+        # Content hashes of files, reused while their size and mtime are unchanged.
+        self.files: "Dict[str, dict]" = {}
+        # Issues of processed items, valid while their fingerprint is unchanged.
+        self.results: "Dict[str, dict]" = {}
+
+    @classmethod
+    def load(cls, file: Path) -> "Manifest":
+        manifest = cls(file)
+        try:
+            data = json.loads(file.read_text(encoding="utf-8"))
+            if data.get("version") == __version__ and data.get("revision") == REVISION:
+                manifest.files = data.get("files", {})
+                manifest.results = data.get("results", {})
+        except Exception:
+            pass
+        return manifest
+
+    def save(self):
+        try:
+            self.file.parent.mkdir(parents=True, exist_ok=True)
+            self.file.write_text(json.dumps({
+                "version": __version__,
+                "revision": REVISION,
+                "files": self.files,
+                "results": self.results,
+            }), encoding="utf-8")
+        except OSError:
+            pass
+
+    def hash(self, file: "Path | None") -> str:
+        if file is None:
+            return ""
+        try:
+            stat = file.stat()
+        except OSError:
+            return ""
+        key = str(file)
+        record = self.files.get(key)
+        if record is not None and record["size"] == stat.st_size and record["mtime"] == stat.st_mtime_ns:
+            return record["hash"]
+        digest = hashlib.sha256()
+        with open(file, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        self.files[key] = {"size": stat.st_size,
+                           "mtime": stat.st_mtime_ns, "hash": digest.hexdigest()}
+        return digest.hexdigest()
+
+    def fingerprint(self, files: "Iterable[Path | None]", *extra: str) -> str:
+        digest = hashlib.sha256()
+        for item in extra:
+            digest.update(item.encode("utf-8"))
+            digest.update(b"\0")
+        for file in files:
+            digest.update(str(file).encode("utf-8"))
+            digest.update(b"\0")
+            digest.update(self.hash(file).encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get(self, key: str, fingerprint: str) -> "List[Issue] | None":
+        record = self.results.get(key)
+        if record is None or record["fingerprint"] != fingerprint:
+            return None
+        return [Issue(message, Severity(level)) for message, level in record["issues"]]
+
+    def put(self, key: str, fingerprint: str, issues: "Iterable[Issue]"):
+        self.results[key] = {"fingerprint": fingerprint, "issues": [
+            [item.message, int(item.level)] for item in issues]}
+
+
+def getManifest(root: Path) -> Manifest:
+    return Manifest.load(root / "dist" / ".gop-cache" / "manifest.json")
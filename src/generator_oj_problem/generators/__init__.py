@@ -1,45 +1,156 @@
-from dataclasses import dataclass
-import io
 import os
 from pathlib import Path
 import sys
+import time
+from typing import Callable, Iterable, List, TextIO, Union
 
 
 ENV_CASE_ID = "GOP_GENERATOR_CASE"
 ENV_TARGET = "GOP_GENERATOR_TARGET"
 ENV_REWRITE = "GOP_GENERATOR_REWRITE"
 ENV_CRLF = "GOP_GENERATOR_CRLF"
+ENV_STREAM = "GOP_GENERATOR_STREAM"
+ENV_RESULT = "GOP_GENERATOR_RESULT"
+# Printed on submitting when there is no result channel (e.g. on Windows).
 SUBMITED = "cfdf14756a566e9e3de87c1980d2fc715032276e"
 
 
-@dataclass
+class _Writer:
+    __slots__ = ("append", "newline")
+
+    def __init__(self, append: "Callable[[str], object]", newline: str) -> None:
+        self.append = append
+        self.newline = newline
+
+    def write(self, text: str):
+        if self.newline != "\n":
+            text = text.replace("\n", self.newline)
+        self.append(text)
+
+
+# In-memory data are lists of chunks, streamed data are open spill files.
+_Data = Union[List[str], TextIO, None]
+
+
 class Case:
-    id: str = 0
-    target: Path = Path(".")
-    input: "str | None" = None
-    output: "str | None" = None
-    rewrite: bool = False
-    crlf: bool = False
+    def __init__(self, id: str = 0, target: Path = Path("."), input: "str | None" = None, output: "str | None" = None, rewrite: bool = False, crlf: bool = False, stream: bool = False) -> None:
+        self.id = id
+        self.target = target
+        self.rewrite = rewrite
+        self.crlf = crlf
+        self.stream = stream
+        self._inputs: _Data = None
+        self._outputs: _Data = None
+        self.input = input
+        self.output = output
+        self.started = time.perf_counter()
+        # Bytes written and time elapsed, set by `submit`.
+        self.submission: "dict | None" = None
 
     @property
     def newline(self):
         return "\r\n" if self.crlf else "\n"
 
+    # The data are kept as lists of chunks and joined only when read,
+    #   so that writing N lines costs O(N) instead of O(N^2).
+    # In stream mode, the data are written to temporary files next to
+    #   the target files instead, and moved into place by `submit`.
+
+    @property
+    def input(self) -> "str | None":
+        return self._read(self._inputs)
+
+    @input.setter
+    def input(self, value: "str | None"):
+        self._inputs = self._assign(self._inputs, value, self.infile)
+
+    @property
+    def output(self) -> "str | None":
+        return self._read(self._outputs)
+
+    @output.setter
+    def output(self, value: "str | None"):
+        self._outputs = self._assign(self._outputs, value, self.outfile)
+
+    @staticmethod
+    def _spill(file: Path) -> TextIO:
+        return open(file.with_name(f".{file.name}.tmp"), "w", encoding="utf-8", newline="")
+
+    @staticmethod
+    def _discard(data: _Data):
+        if data is not None and not isinstance(data, list):
+            data.close()
+            os.remove(data.name)
+
+    @staticmethod
+    def _read(data: _Data) -> "str | None":
+        if data is None:
+            return None
+        if isinstance(data, list):
+            if len(data) != 1:
+                data[:] = ["".join(data)]
+            return data[0]
+        data.flush()
+        with open(data.name, "r", encoding="utf-8", newline="") as f:
+            return f.read()
+
+    def _assign(self, data: _Data, value: "str | None", file: Path) -> _Data:
+        self._discard(data)
+        if value is None:
+            return None
+        if self.stream:
+            data = self._spill(file)
+            data.write(value)
+            return data
+        return [value]
+
+    def _print(self, data: _Data, file: Path, *args, **kwargs) -> _Data:
+        if data is None:
+            data = self._spill(file) if self.stream else []
+        append = data.append if isinstance(data, list) else data.write
+        print(*args, file=_Writer(append, self.newline), **kwargs)
+        return data
+
+    def _save(self, data: _Data, file: Path) -> _Data:
+        if isinstance(data, list):
+            file.write_bytes(self._read(data).encode("utf-8"))
+            return data
+        data.close()
+        os.replace(data.name, file)
+        return None
+
     def In(self, *args, **kwargs):
-        if self.input is None:
-            self.input = ""
-        with io.StringIO(self.input, newline=self.newline) as to:
-            to.seek(len(self.input))
-            print(*args, file=to, **kwargs)
-            self.input = to.getvalue()
+        self._inputs = self._print(self._inputs, self.infile, *args, **kwargs)
 
     def Out(self, *args, **kwargs):
-        if self.output is None:
-            self.output = ""
-        with io.StringIO(self.output, newline=self.newline) as to:
-            to.seek(len(self.output))
-            print(*args, file=to, **kwargs)
-            self.output = to.getvalue()
+        self._outputs = self._print(self._outputs, self.outfile, *args, **kwargs)
+
+    # Bulk writers for numeric data, accepting any iterable, `array.array` or
+    #   NumPy arrays, and formatting a whole row (or matrix) at once.
+
+    @staticmethod
+    def _row(seq: "Iterable", sep: str) -> str:
+        if hasattr(seq, "tolist"):
+            seq = seq.tolist()
+        return sep.join(map(str, seq))
+
+    @classmethod
+    def _matrix(cls, rows: "Iterable[Iterable]", sep: str) -> str:
+        if hasattr(rows, "tolist"):
+            rows = rows.tolist()
+        return "\n".join(cls._row(row, sep) for row in rows)
+
+    def InArray(self, seq: "Iterable", sep: str = " "):
+        self.In(self._row(seq, sep))
+
+    def OutArray(self, seq: "Iterable", sep: str = " "):
+        self.Out(self._row(seq, sep))
+
+    def InMatrix(self, rows: "Iterable[Iterable]", sep: str = " "):
+        self.In(self._matrix(rows, sep))
+
+    def OutMatrix(self, rows: "Iterable[Iterable]", sep: str = " "):
+        self.Out(self._matrix(rows, sep))
 
     @property
     def infile(self):
@@ -49,8 +160,15 @@ class Case:
     def outfile(self):
         return (self.target / f"{self.id}.out")
 
+    def _abort(self):
+        self._discard(self._inputs)
+        self._discard(self._outputs)
+        self._inputs = self._outputs = None
+        exit(1)
+
     def submit(self, silence: bool = False):
-        if self.input is not None:
+        written = {"input": 0, "output": 0}
+        if self._inputs is not None:
             if self.infile.exists():
                 if self.rewrite:
                     if not silence:
@@ -60,9 +178,10 @@ class Case:
                     if not silence:
                         print(
                             f"Input file {self.infile} exists.", file=sys.stderr)
-                    exit(1)
-            self.infile.write_bytes(self.input.encode("utf-8"))
-        if self.output is not None:
+                    self._abort()
+            self._inputs = self._save(self._inputs, self.infile)
+            written["input"] = self.infile.stat().st_size
+        if self._outputs is not None:
             if self.outfile.exists():
                 if self.rewrite:
                     if not silence:
@@ -72,11 +191,27 @@ class Case:
                     if not silence:
                         print(
                             f"Output file {self.outfile} exists.", file=sys.stderr)
-                    exit(1)
-            self.outfile.write_bytes(self.output.encode("utf-8"))
+                    self._abort()
+            self._outputs = self._save(self._outputs, self.outfile)
+            written["output"] = self.outfile.stat().st_size
+        self.submission = {**written,
+                           "elapsed": time.perf_counter() - self.started}
         if not silence:
-            print(SUBMITED, end="")
+            if reporter is None:
+                print(SUBMITED, end="")
+            else:
+                reporter(self.submission)
+
+
+def _reportTo(fd: int) -> "Callable[[dict], None]":
+    def report(submission: dict):
+        import json
+        os.write(fd, (json.dumps(submission) + "\n").encode("utf-8"))
+    return report
+
 
+# Where submissions are sent, or None to print the sentinel instead.
+reporter: "Callable[[dict], None] | None" = None
 
 data: Case = Case()
 
@@ -85,5 +220,8 @@ try:
     data.target = Path(os.getenv(ENV_TARGET) or ".")
     data.rewrite = os.getenv(ENV_REWRITE) == "1"
     data.crlf = os.getenv(ENV_CRLF) == "1"
+    data.stream = os.getenv(ENV_STREAM) == "1"
+    if os.getenv(ENV_RESULT):
+        reporter = _reportTo(int(os.environ[ENV_RESULT]))
 except:
     pass
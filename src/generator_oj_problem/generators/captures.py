@@ -0,0 +1,109 @@
+import io
+import json
+import subprocess
+import threading
+import time
+from typing import BinaryIO, List
+
+from .limits import killGroup, waitLimited
+
+CAPTURE_LIMIT = 64 * 1024
+
+
+class BoundedBuffer:
+    # Keep only the head and the tail of written data, so that a chatty generator costs bounded memory.
+    def __init__(self, limit: int = CAPTURE_LIMIT) -> None:
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.headLimit = limit // 2
+        self.tailLimit = limit - self.headLimit
+        self.total = 0
+
+    def write(self, data: bytes):
+        self.total += len(data)
+        if len(self.head) < self.headLimit:
+            taken = self.headLimit - len(self.head)
+            self.head += data[:taken]
+            data = data[taken:]
+        if data:
+            self.tail += data[-self.tailLimit:]
+            if len(self.tail) > self.tailLimit:
+                del self.tail[:len(self.tail) - self.tailLimit]
+
+    def getvalue(self) -> str:
+        omitted = self.total - len(self.head) - len(self.tail)
+        text = self.head.decode("utf-8", "replace")
+        if omitted > 0:
+            text += f"\n... ({omitted} bytes omitted) ...\n"
+        return text + self.tail.decode("utf-8", "replace")
+
+
+class BoundedText(io.TextIOBase):
+    def __init__(self, limit: int = CAPTURE_LIMIT) -> None:
+        super().__init__()
+        self.buffer = BoundedBuffer(limit)
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        self.buffer.write(text.encode("utf-8", "replace"))
+        return len(text)
+
+    def getvalue(self) -> str:
+        return self.buffer.getvalue()
+
+
+class GeneratorResult:
+    def __init__(self, returncode: int, stdout: str = "", stderr: str = "", submission: "dict | None" = None, cpu: "float | None" = None) -> None:
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.submission = submission
+        # CPU time of the generator run, where it is known.
+        self.cpu = cpu
+
+
+def parseSubmission(text: str) -> "dict | None":
+    for line in reversed(text.splitlines()):
+        try:
+            return json.loads(line)
+        except ValueError:
+            continue
+    return None
+
+
+def _drain(stream: BinaryIO, buffer: BoundedBuffer):
+    with stream:
+        for chunk in iter(lambda: stream.read1(65536), b""):
+            buffer.write(chunk)
+
+
+def capture(process: subprocess.Popen, timeout: float = 0, result: "BinaryIO | None" = None) -> GeneratorResult:
+    # Raises `subprocess.TimeoutExpired` after killing the process group if it runs out of time.
+    streams = [process.stdout, process.stderr] + ([result] if result else [])
+    buffers = [BoundedBuffer() for _ in streams]
+    # Streams not piped (e.g. redirected to a file) are left empty.
+    threads: "List[threading.Thread]" = [threading.Thread(target=_drain, args=item, daemon=True)
+                                         for item in zip(streams, buffers) if item[0] is not None]
+    for thread in threads:
+        thread.start()
+
+    deadline = time.monotonic() + timeout if timeout > 0 else None
+    usage, expired = waitLimited(process, timeout, lambda: killGroup(process))
+    if expired:
+        for thread in threads:
+            thread.join()
+        raise subprocess.TimeoutExpired(process.args, timeout)
+
+    # The generator may have exited already, with its children still holding the pipes.
+    for thread in threads:
+        thread.join(None if deadline is None else max(0, deadline - time.monotonic()))
+    if any(thread.is_alive() for thread in threads):
+        killGroup(process)
+        for thread in threads:
+            thread.join()
+
+    return GeneratorResult(process.returncode, buffers[0].getvalue(), buffers[1].getvalue(),
+                           parseSubmission(buffers[2].getvalue()) if result else None,
+                           None if usage is None else usage[0])
@@ -0,0 +1,149 @@
+import math
+import os
+import signal
+import subprocess
+import sys
+import threading
+from typing import Callable, List, Tuple
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+MB = 1024 * 1024
+
+
+class Limits:
+    # Wall-clock timeout and CPU time in seconds, memory in MB, 0 for no limit.
+    def __init__(self, timeout: float = 0.0, cpu: float = 0.0, memory: float = 0.0) -> None:
+        self.timeout = timeout
+        self.cpu = cpu
+        self.memory = memory
+
+    def rlimits(self) -> "List[Tuple[int, Tuple[int, int]]]":
+        if resource is None:
+            return []
+        result = []
+        if self.cpu > 0:
+            seconds = max(1, math.ceil(self.cpu))
+            result.append((resource.RLIMIT_CPU, (seconds, seconds + 1)))
+        if self.memory > 0:
+            size = int(self.memory * MB)
+            result.append((resource.RLIMIT_AS, (size, size)))
+        return result
+
+    def popen(self, args: "List[str]", **kwargs) -> subprocess.Popen:
+        # preexec_fn is not safe when threads are running, so the limits are set on
+        #   the started process on Linux, or by a shell before exec elsewhere.
+        rlimits = self.rlimits()
+        if rlimits and not hasattr(resource, "prlimit"):
+            script = []
+            for kind, (soft, hard) in rlimits:
+                if kind == resource.RLIMIT_CPU:
+                    script.append(f"ulimit -S -t {soft}; ulimit -H -t {hard};")
+                else:
+                    # Some systems (e.g. macOS) can not limit the address space, so it is skipped there.
+                    script.append(f"ulimit -S -v {soft // 1024} 2>/dev/null; ulimit -H -v {hard // 1024} 2>/dev/null;")
+            executable = kwargs.pop("executable", None)
+            if executable is not None:
+                args = [executable, *args[1:]]
+            args = ["/bin/sh", "-c", f"{' '.join(script)} exec \"$@\"", "sh", *args]
+        process = subprocess.Popen(args, **kwargs)
+        if rlimits and hasattr(resource, "prlimit"):
+            try:
+                for kind, limit in rlimits:
+                    resource.prlimit(process.pid, kind, limit)
+            except ProcessLookupError:
+                pass
+            except BaseException:
+                if kwargs.get("start_new_session"):
+                    killGroup(process)
+                else:
+                    process.kill()
+                process.wait()
+                raise
+        return process
+
+
+def limitCpu(cpu: float):
+    # Limit the CPU time of the current process to `cpu` seconds from now, or lift it for 0.
+    if resource is None:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if cpu <= 0:
+        resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = max(1, math.ceil(usage.ru_utime + usage.ru_stime + cpu))
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def killGroup(process: subprocess.Popen):
+    # Processes are started in their own session, so their children are killed too.
+    try:
+        if os.name == "posix":
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except OSError:
+        pass
+
+
+def maxRss(usage) -> int:
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    return usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+
+
+def waitUsage(process: subprocess.Popen) -> "Tuple[float, int] | None":
+    # Wait for the process, and return its CPU time and peak RSS where the rusage of a child is available.
+    if not hasattr(os, "wait4"):
+        process.wait()
+        return None
+    _, status, usage = os.wait4(process.pid, 0)
+    # The process is reaped here, so Popen must not wait for it again.
+    process.returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+    return usage.ru_utime + usage.ru_stime, maxRss(usage)
+
+
+def waitCpu(process: subprocess.Popen) -> "float | None":
+    usage = waitUsage(process)
+    return None if usage is None else usage[0]
+
+
+def waitLimited(process: subprocess.Popen, timeout: float, kill: "Callable[[], None]") -> "Tuple[Tuple[float, int] | None, bool]":
+    # Like `waitUsage`, but call `kill` once the process runs longer than `timeout` seconds (0 for no limit).
+    # Returns the usage, and whether the process was killed for the timeout.
+    lock = threading.Lock()
+    done = expired = False
+
+    def expire():
+        nonlocal expired
+        with lock:
+            if not done and process.returncode is None:
+                expired = True
+                kill()
+
+    timer = threading.Timer(timeout, expire) if timeout > 0 else None
+    if timer is not None:
+        timer.start()
+    try:
+        if timer is not None and hasattr(os, "waitid"):
+            # Wait without reaping first, so that the timer never kills a reused pid.
+            os.waitid(os.P_PID, process.pid, os.WEXITED | os.WNOWAIT)
+            with lock:
+                done = True
+        usage = waitUsage(process)
+    finally:
+        if timer is not None:
+            timer.cancel()
+    return usage, expired
+
+
+def signalName(number: int) -> str:
+    try:
+        return signal.Signals(number).name
+    except ValueError:
+        return f"signal {number}"
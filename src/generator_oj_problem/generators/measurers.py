@@ -0,0 +1,150 @@
+from concurrent.futures import ThreadPoolExecutor
+import math
+import os
+from pathlib import Path
+import statistics
+import subprocess
+import time
+from typing import Iterable, List, Tuple
+
+from generator_oj_problem.models import Issue, Problem, Severity, TestCase
+from generator_oj_problem.profiling import stage
+from .limits import MB, Limits, maxRss, resource, signalName, waitLimited
+from .solvers import TestSolver
+
+# Solutions are only killed at this multiple of the limits, so that overruns are measured instead of hidden.
+LIMIT_MARGIN = 2.0
+TIME_NEAR = 0.5
+MEMORY_NEAR = 0.8
+TIME_TRIVIAL = 0.01
+TIME_STRESS = 0.1
+TIME_SAFETY = 2.0
+
+
+class Measurement:
+    def __init__(self, wall: float = 0.0, cpu: float = 0.0, rss: int = 0, returncode: int = 0, timeout: bool = False) -> None:
+        self.wall = wall
+        self.cpu = cpu
+        self.rss = rss
+        self.returncode = returncode
+        self.timeout = timeout
+
+
+def runLimited(command: "List[str]", infile: Path, cwd: Path, limits: Limits) -> Measurement:
+    result = Measurement()
+
+    with open(infile, "rb") as stdin:
+        start = time.perf_counter()
+        process = limits.popen(command, cwd=cwd, stdin=stdin, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL)
+
+    (result.cpu, result.rss), result.timeout = waitLimited(process, limits.timeout, process.kill)
+    result.wall = time.perf_counter() - start
+    result.returncode = process.returncode
+    return result
+
+
+def selfRss() -> int:
+    return maxRss(resource.getrusage(resource.RUSAGE_SELF))
+
+
+class TestMeasurer(TestSolver):
+    def measure(self, repeat: int = 1, jobs: int = 1) -> "Iterable[Issue]":
+        if resource is None or not hasattr(os, "wait4"):
+            yield Issue("Measuring the solution needs resource limits and the rusage of child processes (os.wait4), which are not supported on this platform.", Severity.Error)
+            return
+
+        problem = Problem()
+        yield from self.reader.load(problem)
+        if problem.time <= 0 or problem.memory <= 0:
+            yield Issue("The time and memory limits must be positive.", Severity.Error)
+            return
+
+        yield from self.compile(problem)
+        if self.command is None:
+            return
+
+        cases = [(case, "sample") for case in self.reader.samples()] + \
+            [(case, "test") for case in self.reader.tests()]
+
+        if jobs <= 1:
+            measurements = [self._measure(problem, case, type, repeat)
+                            for case, type in cases]
+        else:
+            # Concurrent runs are faster, but share CPU and memory bandwidth, so timings are less accurate.
+            with ThreadPoolExecutor(max_workers=jobs) as pool:
+                measurements = list(pool.map(
+                    lambda item: self._measure(problem, item[0], item[1], repeat), cases))
+
+        trivial: "List[str]" = []
+        slowest: "Tuple[float, str] | None" = None
+        lowest: "int | None" = None
+        for (case, type), (runs, error) in zip(cases, measurements):
+            if error is not None:
+                yield Issue(f"Failed to measure {type} case {case.name}: {error}", Severity.Error)
+                continue
+            yield from self._judge(problem, case, type, runs)
+            if any(run.timeout or run.returncode != 0 for run in runs):
+                continue
+            rss = max(run.rss for run in runs)
+            lowest = rss if lowest is None else min(lowest, rss)
+            cpu = statistics.median(run.cpu for run in runs)
+            if type == "test" and cpu < problem.time * TIME_TRIVIAL:
+                trivial.append(case.name)
+            if slowest is None or cpu > slowest[0]:
+                slowest = (cpu, f"{type} case {case.name}")
+
+        # A child keeps the peak RSS of the forked parent across exec, so small peaks are not exact.
+        footprint = selfRss()
+        if lowest is not None and lowest <= footprint:
+            yield Issue(f"Peak RSS below {footprint / MB:.1f} MB (the footprint of this tool) is reported as it.", Severity.Info)
+        if trivial:
+            yield Issue(f"{len(trivial)} test case(s) take less than {TIME_TRIVIAL:.0%} of the time limit: {', '.join(trivial)}.", Severity.Info)
+        if slowest is None:
+            return
+        if slowest[0] < problem.time * TIME_STRESS:
+            yield Issue(f"No case takes more than {TIME_STRESS:.0%} of the time limit, the tests may not stress the solution.", Severity.Warning)
+        suggested = max(1, math.ceil(slowest[0] * TIME_SAFETY))
+        yield Issue(f"Suggested time limit: {suggested} s ({TIME_SAFETY:g}x the median CPU time {slowest[0]:.3f} s of the slowest {slowest[1]} over {repeat} run(s), current {problem.time:g} s).")
+
+    def _measure(self, problem: Problem, case: TestCase, type: str, repeat: int) -> "Tuple[List[Measurement], str | None]":
+        print(f"  Measure {type} case {case.name}...")
+        runs = []
+        try:
+            with stage(f"measure/{type}", case.name) as usage:
+                usage.cpu = 0.0
+                for _ in range(repeat):
+                    runs.append(runLimited(self.command, case.infile, self.root, Limits(
+                        problem.time * LIMIT_MARGIN * 2 + 1, problem.time * LIMIT_MARGIN, problem.memory * LIMIT_MARGIN)))
+                    usage.cpu += runs[-1].cpu
+        except Exception as ex:
+            return runs, str(ex)
+        return runs, None
+
+    def _judge(self, problem: Problem, case: TestCase, type: str, runs: "List[Measurement]") -> "Iterable[Issue]":
+        name = f"{type} case {case.name}"
+        wall = statistics.median(run.wall for run in runs)
+        cpu = statistics.median(run.cpu for run in runs)
+        rss = max(run.rss for run in runs)
+        yield Issue(f"Measured {name}: {cpu:.3f} s CPU, {wall:.3f} s wall, {rss / MB:.1f} MB.")
+
+        failed = next((run for run in runs if run.timeout or run.returncode != 0), None)
+        if failed is not None:
+            if failed.timeout:
+                reason = "timed out"
+            elif failed.returncode < 0:
+                reason = f"was killed by {signalName(-failed.returncode)}"
+            else:
+                reason = f"exited with {failed.returncode}"
+            yield Issue(f"The solution {reason} on {name}, it may exceed the limits.", Severity.Error)
+            return
+
+        if cpu > problem.time:
+            yield Issue(f"The solution exceeds the time limit on {name} ({cpu:.3f} s > {problem.time:g} s).", Severity.Error)
+        elif cpu > problem.time * TIME_NEAR:
+            yield Issue(f"The solution is near the time limit on {name} ({cpu:.3f} s of {problem.time:g} s).", Severity.Warning)
+
+        if rss > problem.memory * MB:
+            yield Issue(f"The solution exceeds the memory limit on {name} ({rss / MB:.1f} MB > {problem.memory:g} MB).", Severity.Error)
+        elif rss > problem.memory * MB * MEMORY_NEAR:
+            yield Issue(f"The solution is near the memory limit on {name} ({rss / MB:.1f} MB of {problem.memory:g} MB).", Severity.Warning)
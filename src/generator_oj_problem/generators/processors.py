@@ -1,12 +1,18 @@
+from concurrent.futures import ThreadPoolExecutor
 import os
 import subprocess
 from pathlib import Path
+from queue import Queue
 import sys
-from typing import Iterable
+from typing import Iterable, List
 
 from generator_oj_problem.models import Issue, Problem, Severity
 from generator_oj_problem.pipelines import Reader
-from . import ENV_CASE_ID, ENV_CRLF, ENV_REWRITE, ENV_TARGET, SUBMITED, Case
+from generator_oj_problem.profiling import fileSize, stage
+from . import ENV_CASE_ID, ENV_CRLF, ENV_RESULT, ENV_REWRITE, ENV_STREAM, ENV_TARGET, SUBMITED, Case
+from .captures import GeneratorResult, capture
+from .limits import Limits, signalName
+from .workers import GeneratorWorker
 
 
 class TestGenerator:
@@ -22,7 +28,7 @@ class TestGenerator:
             self.file.write_text(
                 (Path(__file__).parent / "template.py").read_text())
 
-    def generate(self, start: int, count: int, sample: bool = False, rewrite: bool = False) -> "Iterable[Issue]":
+    def generate(self, start: int, count: int, sample: bool = False, rewrite: bool = False, jobs: int = 1, persistent: bool = False, stream: bool = False, timeout: "float | None" = None, cpu: "float | None" = None, memory: "float | None" = None) -> "Iterable[Issue]":
         if not self.file.exists() or self.file.is_dir():
             yield Issue("Generator is not found.", Severity.Error)
             return
@@ -30,37 +36,125 @@ class TestGenerator:
         problem = Problem()
         yield from self.reader.load(problem)
 
+        # Limits given on the command line override those in problem.yml.
+        limits = Limits(problem.generatorTimeout if timeout is None else timeout,
+                        problem.generatorTime if cpu is None else cpu,
+                        problem.generatorMemory if memory is None else memory)
+
         prefix = "sample" if sample else "test"
         target = self.root / f"{prefix}s"
         if not target.exists() or target.is_file():
             os.makedirs(target)
-        for i in range(start, start + count):
-            case = Case(i, target)
-            print(f"Generate {prefix} case {i}...")
+
+        cases = [Case(i, target, rewrite=rewrite, crlf=problem.crlf, stream=stream)
+                 for i in range(start, start + count)]
+
+        workers: "Queue[GeneratorWorker] | None" = None
+        if persistent:
+            workers = Queue()
+            for _ in range(jobs):
+                workers.put(GeneratorWorker(self.root, self.file, limits))
+
+        try:
+            if jobs <= 1:
+                for case in cases:
+                    yield from self._generate(case, prefix, limits, workers)
+            else:
+                # Each case runs in its own generator process, so threads are
+                # enough to keep up to `jobs` of them running at once.
+                with ThreadPoolExecutor(max_workers=jobs) as pool:
+                    for issues in pool.map(lambda case: self._generate(case, prefix, limits, workers), cases):
+                        yield from issues
+        finally:
+            if workers is not None:
+                while not workers.empty():
+                    workers.get().close()
+
+    def _run(self, case: Case, limits: Limits, workers: "Queue[GeneratorWorker] | None") -> GeneratorResult:
+        if workers is not None:
+            worker = workers.get()
             try:
-                result = subprocess.run(["-u", str(self.file)],
-                                        executable=sys.executable,
-                                        cwd=self.root,
-                                        text=True,
-                                        capture_output=True,
-                                        env={**os.environ,
-                                             ENV_CASE_ID: str(case.id),
-                                             ENV_TARGET: str(case.target.resolve()),
-                                             ENV_REWRITE: "1" if rewrite else "0",
-                                             ENV_CRLF: "1" if problem.crlf else "0",
-                                             "PYTHONUTF8": "1"})
-                stdout = result.stdout
-                if stdout is None or not stdout.endswith(SUBMITED):
-                    yield Issue(f"Generated data is not submitted for {prefix} case {case.id}, please call 'data.submit()' at the end of generator.", Severity.Warning)
-                else:
-                    stdout = stdout.replace(SUBMITED, "")
-                if stdout:
-                    yield Issue(f"Generator standard output for {prefix} case {case.id}:\n{stdout.strip()}", Severity.Info)
-                if result.stderr:
-                    yield Issue(f"Generator standard error for {prefix} case {case.id}:\n{result.stderr.strip()}", Severity.Warning)
-                if result.returncode != 0:
-                    raise Exception(
-                        f"Generator exited with non-zero: {result.returncode}.")
-                yield Issue(f"Generated {prefix} case {case.id}.")
-            except Exception as ex:
-                yield Issue(f"Failed to generate {prefix} case {case.id}: {ex}", Severity.Error)
+                return worker.run(case)
+            finally:
+                workers.put(worker)
+
+        env = {**os.environ,
+               ENV_CASE_ID: str(case.id),
+               ENV_TARGET: str(case.target.resolve()),
+               ENV_REWRITE: "1" if case.rewrite else "0",
+               ENV_CRLF: "1" if case.crlf else "0",
+               ENV_STREAM: "1" if case.stream else "0",
+               "PYTHONUTF8": "1"}
+
+        # The submission is reported through a dedicated pipe where file descriptors
+        #   can be passed, otherwise the generator prints the sentinel instead.
+        result, fds = None, ()
+        if os.name == "posix":
+            read, write = os.pipe()
+            result, fds = os.fdopen(read, "rb"), (write,)
+            env[ENV_RESULT] = str(write)
+
+        # Each generator runs in its own session, so that all its processes are killed on timeout.
+        try:
+            process = limits.popen(["-u", str(self.file)],
+                                   executable=sys.executable,
+                                   cwd=self.root,
+                                   stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE,
+                                   start_new_session=True,
+                                   pass_fds=fds,
+                                   env=env)
+        except BaseException:
+            if result is not None:
+                result.close()
+            raise
+        finally:
+            for fd in fds:
+                os.close(fd)
+        return capture(process, limits.timeout, result)
+
+    @staticmethod
+    def _clean(case: Case):
+        # Remove the data streamed by a failed or killed generator.
+        for file in (case.infile, case.outfile):
+            temp = file.with_name(f".{file.name}.tmp")
+            if temp.exists():
+                os.remove(temp)
+
+    def _generate(self, case: Case, prefix: str, limits: Limits, workers: "Queue[GeneratorWorker] | None" = None) -> "List[Issue]":
+        print(f"Generate {prefix} case {case.id}...")
+        issues: "List[Issue]" = []
+        try:
+            with stage(f"generate/{prefix}", str(case.id)) as usage:
+                result = self._run(case, limits, workers)
+                usage.cpu = result.cpu
+                usage.written = fileSize(case.infile) + fileSize(case.outfile)
+            stdout = result.stdout
+            submission = result.submission
+            if submission is None and stdout.endswith(SUBMITED):
+                submission = {}
+                stdout = stdout[:-len(SUBMITED)]
+            if submission is None:
+                issues.append(Issue(f"Generated data is not submitted for {prefix} case {case.id}, please call 'data.submit()' at the end of generator.", Severity.Warning))
+            if stdout:
+                issues.append(Issue(f"Generator standard output for {prefix} case {case.id}:\n{stdout.strip()}", Severity.Info))
+            if result.stderr:
+                issues.append(Issue(f"Generator standard error for {prefix} case {case.id}:\n{result.stderr.strip()}", Severity.Warning))
+            if result.returncode < 0:
+                raise Exception(
+                    f"Generator was killed by {signalName(-result.returncode)}, it may exceed the limits.")
+            if result.returncode != 0:
+                raise Exception(
+                    f"Generator exited with non-zero: {result.returncode}.")
+            if submission and "elapsed" in submission:
+                size = submission.get("input", 0) + submission.get("output", 0)
+                issues.append(Issue(f"Generated {prefix} case {case.id} ({size} bytes in {submission['elapsed']:.3f} s)."))
+            else:
+                issues.append(Issue(f"Generated {prefix} case {case.id}."))
+        except subprocess.TimeoutExpired as ex:
+            self._clean(case)
+            issues.append(Issue(f"Generator timed out after {ex.timeout:g} s for {prefix} case {case.id}.", Severity.Error))
+        except Exception as ex:
+            self._clean(case)
+            issues.append(Issue(f"Failed to generate {prefix} case {case.id}: {ex}", Severity.Error))
+        return issues
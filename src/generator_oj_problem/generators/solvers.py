@@ -0,0 +1,184 @@
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
+from pathlib import Path
+import re
+import shlex
+import subprocess
+import sys
+from typing import Dict, Iterable, List
+
+from generator_oj_problem.models import Issue, Problem, Severity, TestCase
+from generator_oj_problem.pipelines import Reader
+from generator_oj_problem.profiling import fileSize, stage
+from .captures import capture
+from .trimmers import trimFile
+
+
+class Language:
+    def __init__(self, name: str, suffix: str, compiler: "str | None" = None, flags: "List[str] | None" = None) -> None:
+        self.name = name
+        self.suffix = suffix
+        self.compiler = compiler
+        self.flags = flags or []
+
+
+# Compilers and flags can be overridden by the usual environment variables.
+LANGUAGES: "Dict[str, Language]" = {
+    "c++": Language("C++", ".cpp", os.getenv("CXX") or "g++",
+                    shlex.split(os.getenv("CXXFLAGS") or "-O2 -std=c++17")),
+    "c": Language("C", ".c", os.getenv("CC") or "gcc",
+                  shlex.split(os.getenv("CFLAGS") or "-O2 -std=c11") + ["-lm"]),
+    "python": Language("Python", ".py"),
+}
+
+
+SUFFIXES = {".cpp": "c++", ".cc": "c++", ".cxx": "c++", ".c": "c", ".py": "python"}
+
+
+def getLanguage(name: str) -> "Language | None":
+    name = name.strip().lower()
+    if name.startswith(("c++", "cpp", "g++")):
+        return LANGUAGES["c++"]
+    if name in ("c", "gcc") or re.match(r"c\d+\b", name):
+        return LANGUAGES["c"]
+    if name.startswith("py"):
+        return LANGUAGES["python"]
+    return None
+
+
+def getLanguageOf(file: Path) -> "Language | None":
+    key = SUFFIXES.get(file.suffix.lower())
+    return LANGUAGES[key] if key else None
+
+
+class Program:
+    def __init__(self, source: str, language: Language, cache: Path) -> None:
+        self.source = source
+        self.language = language
+        self.cache = cache
+        self.command: "List[str] | None" = None
+
+    def build(self) -> "Iterable[Issue]":
+        language = self.language
+
+        # The binary is reused until the source, the compiler or its flags change.
+        source = self.source.encode("utf-8")
+        key = hashlib.sha256(b"\0".join([language.name.encode("utf-8"), str(language.compiler).encode(
+            "utf-8"), *(flag.encode("utf-8") for flag in language.flags), source])).hexdigest()
+        folder = self.cache / key
+        file = folder / f"solution{language.suffix}"
+
+        if language.compiler is None:
+            if not file.is_file():
+                folder.mkdir(parents=True, exist_ok=True)
+                file.write_bytes(source)
+            self.command = [sys.executable, str(file)]
+            return
+
+        binary = folder / ("solution.exe" if os.name == "nt" else "solution")
+        if binary.is_file():
+            print("Use compiled program...")
+        else:
+            print(f"Compile program in {language.name}...")
+            folder.mkdir(parents=True, exist_ok=True)
+            file.write_bytes(source)
+            temp = binary.with_name(f".{binary.name}.tmp")
+            try:
+                with stage("compile"):
+                    result = subprocess.run([language.compiler, str(file), "-o", str(temp), *language.flags],
+                                            capture_output=True, text=True)
+            except OSError as ex:
+                yield Issue(f"Failed to run compiler {language.compiler}: {ex}", Severity.Error)
+                return
+            if result.returncode != 0:
+                if temp.exists():
+                    os.remove(temp)
+                yield Issue(f"Failed to compile the program:\n{(result.stderr or result.stdout).strip()}", Severity.Error)
+                return
+            if result.stderr:
+                yield Issue(f"Compiler output:\n{result.stderr.strip()}", Severity.Warning)
+            os.replace(temp, binary)
+        self.command = [str(binary)]
+
+
+class TestSolver:
+    def __init__(self, root: Path, reader: Reader) -> None:
+        self.root = root
+        self.reader = reader
+        self.cache = root / "dist" / ".gop-cache" / "solutions"
+        self.command: "List[str] | None" = None
+
+    def compile(self, problem: Problem) -> "Iterable[Issue]":
+        language = getLanguage(problem.solutionLanguage)
+        if language is None:
+            yield Issue(f"The solution language {problem.solutionLanguage} is not supported.", Severity.Error)
+            return
+        if problem.solution.isspace():
+            yield Issue("The solution is missing.", Severity.Error)
+            return
+
+        program = Program(problem.solution, language, self.cache)
+        yield from program.build()
+        self.command = program.command
+
+    def solve(self, jobs: int = 1, rewrite: bool = False, timeout: float = 10.0) -> "Iterable[Issue]":
+        problem = Problem()
+        yield from self.reader.load(problem)
+
+        yield from self.compile(problem)
+        if self.command is None:
+            return
+
+        cases = []
+        for case, type in [(case, "sample") for case in self.reader.samples()] + \
+                [(case, "test") for case in self.reader.tests()]:
+            if not rewrite and self._outfile(case).exists():
+                yield Issue(f"Output file {self._outfile(case)} exists, use -r to rewrite it.", Severity.Warning)
+            else:
+                cases.append((case, type))
+
+        if jobs <= 1:
+            for case, type in cases:
+                yield from self._solve(problem, case, type, timeout)
+        else:
+            with ThreadPoolExecutor(max_workers=jobs) as pool:
+                for result in pool.map(lambda item: self._solve(problem, *item, timeout), cases):
+                    yield from result
+
+    @staticmethod
+    def _outfile(case: TestCase) -> Path:
+        return case.outfile or case.infile.with_suffix(".out")
+
+    def _solve(self, problem: Problem, case: TestCase, type: str, timeout: float = 0.0) -> "List[Issue]":
+        print(f"  Solve {type} case {case.name}...")
+        outfile = self._outfile(case)
+        temp = outfile.with_name(f".{outfile.name}.tmp")
+        try:
+            with stage(f"solve/{type}", case.name) as usage:
+                usage.read = fileSize(case.infile)
+                # Output is streamed into the file, never held in memory.
+                with open(case.infile, "rb") as stdin, open(temp, "wb") as stdout:
+                    process = subprocess.Popen(self.command, cwd=self.root, stdin=stdin, stdout=stdout,
+                                               stderr=subprocess.PIPE, start_new_session=True)
+                result = capture(process, timeout)
+                usage.cpu = result.cpu
+                if result.returncode != 0:
+                    os.remove(temp)
+                    message = f"Solution exited with non-zero {result.returncode} for {type} case {case.name}."
+                    if result.stderr:
+                        message += f"\n{result.stderr.strip()}"
+                    return [Issue(message, Severity.Error)]
+                os.replace(temp, outfile)
+                # Keep outputs in the same form as `trim` does.
+                trimFile(outfile, problem.crlf)
+                usage.written = fileSize(outfile)
+        except subprocess.TimeoutExpired as ex:
+            if temp.exists():
+                os.remove(temp)
+            return [Issue(f"Solution timed out after {ex.timeout:g} s for {type} case {case.name}.", Severity.Error)]
+        except Exception as ex:
+            if temp.exists():
+                os.remove(temp)
+            return [Issue(f"Failed to solve {type} case {case.name}: {ex}", Severity.Error)]
+        return [Issue(f"Solved {type} case {case.name}.")]
@@ -0,0 +1,244 @@
+from itertools import zip_longest
+from pathlib import Path
+import random
+import signal
+import subprocess
+import threading
+import time
+from typing import BinaryIO, Dict, Iterable, List, Tuple
+
+from generator_oj_problem.models import Issue, Problem, Severity, TestCase
+from generator_oj_problem.pipelines import Reader
+from . import Case
+from .limits import killGroup, signalName
+from .solvers import Program, TestSolver, getLanguageOf
+from .workers import loadGenerator, runGenerator
+
+BATCH = 16
+TOKEN_PREVIEW = 32
+
+
+class MemoryCase(Case):
+    # Data are kept for the stress test instead of being saved.
+    def submit(self, silence: bool = False):
+        self.submission = {"elapsed": time.perf_counter() - self.started}
+
+
+def tokens(stream: BinaryIO) -> "Iterable[bytes]":
+    carry = b""
+    for chunk in iter(lambda: stream.read1(65536), b""):
+        data = carry + chunk
+        parts = data.split()
+        # The last token may continue in the next chunk.
+        carry = parts.pop() if parts and not data[-1:].isspace() else b""
+        yield from parts
+    if carry:
+        yield carry
+
+
+def preview(token: "bytes | None") -> str:
+    if token is None:
+        return "end of output"
+    text = token[:TOKEN_PREVIEW].decode("utf-8", "replace")
+    return repr(text + "..." if len(token) > TOKEN_PREVIEW else text)
+
+
+def compareRuns(reference: "List[str]", brute: "List[str]", data: bytes, cwd: Path, timeout: float) -> "str | None":
+    # Both programs run at once, and their outputs are compared token by token as they come.
+    processes = [subprocess.Popen(command, cwd=cwd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                  stderr=subprocess.DEVNULL, start_new_session=True)
+                 for command in (reference, brute)]
+    names = ["reference", "brute-force"]
+
+    def feed(process: subprocess.Popen):
+        try:
+            process.stdin.write(data)
+            process.stdin.close()
+        except OSError:
+            pass
+
+    timedOut = False
+
+    def kill():
+        nonlocal timedOut
+        timedOut = True
+        for process in processes:
+            killGroup(process)
+
+    feeders = [threading.Thread(target=feed, args=(process,), daemon=True)
+               for process in processes]
+    for thread in feeders:
+        thread.start()
+    timer = threading.Timer(timeout, kill) if timeout > 0 else None
+    if timer is not None:
+        timer.start()
+
+    mismatch = None
+    try:
+        for index, (expected, found) in enumerate(zip_longest(tokens(processes[0].stdout), tokens(processes[1].stdout))):
+            if expected != found:
+                mismatch = f"token {index + 1} differs, expected {preview(expected)} but found {preview(found)}"
+                break
+    finally:
+        if mismatch is not None:
+            for process in processes:
+                killGroup(process)
+        for process in processes:
+            process.wait()
+            process.stdout.close()
+        if timer is not None:
+            timer.cancel()
+        for thread in feeders:
+            thread.join()
+
+    if timedOut:
+        return f"timed out after {timeout:g} s"
+    for name, process in zip(names, processes):
+        # Processes still running at a mismatch are killed by us.
+        if process.returncode < 0 and mismatch is None:
+            return f"{name} was killed by {signalName(-process.returncode)}"
+        if process.returncode > 0:
+            return f"{name} exited with {process.returncode}"
+    return mismatch
+
+
+class GeneratorTimeout(BaseException):
+    # Not an Exception, so that it is not swallowed by the generator.
+    pass
+
+
+def _alarm(signum, frame):
+    raise GeneratorTimeout()
+
+
+# State of each pool worker, set once by `_initialize`.
+_state: "Dict[str, object]" = {}
+
+
+def _initialize(file: Path, root: Path, crlf: bool, reference: "List[str]", brute: "List[str]", timeout: float):
+    _state.update(code=loadGenerator(file), file=file, root=root,
+                  crlf=crlf, reference=reference, brute=brute, timeout=timeout)
+    # The generator runs in this process, so it is bounded by a timer where supported.
+    if hasattr(signal, "setitimer"):
+        signal.signal(signal.SIGALRM, _alarm)
+
+
+def _iterate(seed: int) -> "Tuple[str, bytes] | None":
+    # Run the generator in this process with a reproducible seed, and keep the data in memory.
+    random.seed(seed)
+    case = MemoryCase(seed, _state["root"], crlf=_state["crlf"])
+    timeout = _state["timeout"]
+    timed = timeout > 0 and hasattr(signal, "setitimer")
+    try:
+        if timed:
+            signal.setitimer(signal.ITIMER_REAL, timeout)
+        try:
+            returncode, _, stderr = runGenerator(_state["code"], _state["file"], case)
+        finally:
+            if timed:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+    except GeneratorTimeout:
+        return f"generator timed out after {timeout:g} s", b""
+    if returncode != 0:
+        return f"generator exited with {returncode}:\n{stderr.strip()}", b""
+    if case.input is None:
+        return "generator produced no input", b""
+
+    data = case.input.encode("utf-8")
+    try:
+        reason = compareRuns(_state["reference"], _state["brute"],
+                             data, _state["root"], timeout)
+    except OSError as ex:
+        reason = f"failed to run the programs: {ex}"
+    return None if reason is None else (reason, data)
+
+
+def _batch(seeds: "List[int]") -> "Tuple[int, int, str, bytes] | Tuple[int, None, None, None]":
+    # Stop at the first failing seed of the batch.
+    for done, seed in enumerate(seeds, 1):
+        failure = _iterate(seed)
+        if failure is not None:
+            return done, seed, failure[0], failure[1]
+    return len(seeds), None, None, None
+
+
+class TestStresser(TestSolver):
+    def __init__(self, root: Path, reader: Reader) -> None:
+        super().__init__(root, reader)
+        self.file = root / "generator.py"
+
+    def stress(self, brute: Path, count: int = 1000, jobs: int = 1, seed: "int | None" = None, timeout: float = 10.0) -> "Iterable[Issue]":
+        if not self.file.exists() or self.file.is_dir():
+            yield Issue("Generator is not found.", Severity.Error)
+            return
+        language = getLanguageOf(brute)
+        if language is None:
+            yield Issue(f"The language of {brute} is not supported, use .cpp, .c or .py.", Severity.Error)
+            return
+
+        problem = Problem()
+        yield from self.reader.load(problem)
+        yield from self.compile(problem)
+        if self.command is None:
+            return
+        program = Program(brute.read_text(encoding="utf-8"), language, self.cache)
+        yield from program.build()
+        if program.command is None:
+            return
+
+        if seed is None:
+            seed = random.randrange(1 << 31)
+        seeds = list(range(seed, seed + count))
+        batches = [seeds[i:i + BATCH] for i in range(0, len(seeds), BATCH)]
+
+        from concurrent.futures import ProcessPoolExecutor
+        print(f"Stress {count} case(s) from seed {seed}...")
+        start = reported = time.perf_counter()
+        passed = 0
+        failure = None
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_initialize,
+                                 initargs=(self.file, self.root, problem.crlf, self.command, program.command, timeout)) as pool:
+            # Keep a bounded window of batches in flight, so that nothing more is started after a failure.
+            pending = iter(batches)
+            futures = [pool.submit(_batch, batch)
+                       for batch in (next(pending, None) for _ in range(jobs * 2)) if batch is not None]
+            while futures:
+                done, failed, reason, data = futures.pop(0).result()
+                if failed is not None:
+                    passed += done - 1
+                    failure = (failed, reason, data)
+                    break
+                passed += done
+                batch = next(pending, None)
+                if batch is not None:
+                    futures.append(pool.submit(_batch, batch))
+                if time.perf_counter() - reported >= 1:
+                    reported = time.perf_counter()
+                    print(f"  Passed {passed} case(s)...")
+            for future in futures:
+                future.cancel()
+
+        elapsed = time.perf_counter() - start
+        if failure is None:
+            yield Issue(f"All {passed} case(s) passed in {elapsed:.1f} s ({passed / elapsed * 60 if elapsed > 0 else 0:.0f} per minute).")
+            return
+
+        failed, reason, data = failure
+        yield Issue(f"Case with seed {failed} failed after {passed} passed case(s): {reason}", Severity.Error)
+        if data:
+            yield from self._save(problem, data, timeout)
+
+    def _save(self, problem: Problem, data: bytes, timeout: float) -> "Iterable[Issue]":
+        target = self.root / "tests"
+        target.mkdir(parents=True, exist_ok=True)
+        names = [int(file.stem) for file in target.glob("*.in") if file.stem.isdigit()]
+        name = str(max(names, default=-1) + 1)
+        infile = target / f"{name}.in"
+        infile.write_bytes(data)
+        # The reference solution may be what failed, so it is bounded by the same timeout.
+        issues = self._solve(problem, TestCase(name, infile=infile, outfile=target / f"{name}.out"), "test", timeout)
+        yield from issues
+        if any(item.level == Severity.Error for item in issues):
+            yield Issue(f"Saved the failed input to {infile}, but its output was not produced.", Severity.Warning)
+        else:
+            yield Issue(f"Saved the failed case to {infile}.", Severity.Warning)
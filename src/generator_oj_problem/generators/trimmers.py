@@ -1,9 +1,71 @@
+from mmap import ACCESS_READ, mmap
+import os
 from pathlib import Path
 from typing import Iterable
 
-from ..models import Issue, Problem, Severity, TestCase
+from ..models import Issue, Problem, Severity, TestCase, countEol
 from ..pipelines import Reader
-from . import Case
+from ..profiling import fileSize, stage
+
+CHUNK = 16 * 1024 * 1024
+WHITESPACE = b" \t\n\r\x0b\x0c"
+
+
+def isTrimmed(raw: "bytes | mmap", crlf: bool) -> bool:
+    newline = b"\r\n" if crlf else b"\n"
+    # Ended by exactly one newline, right after non-whitespace content.
+    if raw[-len(newline):] != newline or raw[-len(newline) - 1:-len(newline)] in WHITESPACE:
+        return False
+
+    lf, crlfs, cr = countEol(raw)
+    return lf == cr == 0 if crlf else crlfs == cr == 0
+
+
+def trimFile(file: Path, crlf: bool) -> bool:
+    # Returns whether the file is rewritten. Files without any content are left untouched.
+    with open(file, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return False
+        with mmap(f.fileno(), 0, access=ACCESS_READ) as raw:
+            if isTrimmed(raw, crlf):
+                return False
+
+    newline = b"\r\n" if crlf else b"\n"
+    temp = file.with_name(f".{file.name}.tmp")
+    try:
+        with open(file, "rb") as src, open(temp, "wb") as dst:
+            # Data are normalized chunk by chunk, and trailing whitespace of the
+            #   whole file is cut at the end, so only one chunk is held at once.
+            pos = end = 0
+            carry = b""
+            for chunk in iter(lambda: src.read(CHUNK), b""):
+                chunk = carry + chunk
+                # A trailing "\r" may be followed by "\n" in the next chunk.
+                carry = b"\r" if chunk.endswith(b"\r") else b""
+                if carry:
+                    chunk = chunk[:-1]
+                # A single "\r" ends a line too.
+                chunk = chunk.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+                if crlf:
+                    chunk = chunk.replace(b"\n", b"\r\n")
+                dst.write(chunk)
+                content = len(chunk.rstrip(WHITESPACE))
+                if content:
+                    end = pos + content
+                pos += len(chunk)
+            if end == 0:
+                dst.close()
+                os.remove(temp)
+                return False
+            dst.seek(end)
+            dst.truncate()
+            dst.write(newline)
+        os.replace(temp, file)
+    except BaseException:
+        if temp.exists():
+            os.remove(temp)
+        raise
+    return True
 
 
 class TestTrimmer:
@@ -17,14 +79,17 @@ class TestTrimmer:
 
         def item(case: TestCase, type: str):
             print(f"  Trim {type} case {case.name}...")
-            target = Case(case.name, self.root /
-                          f"{type}s", rewrite=True, crlf=problem.crlf)
-            for l in case.input.rstrip().rstrip("\r\n").splitlines():
-                target.In(l.rstrip("\r\n"))
-            for l in case.output.rstrip().rstrip("\r\n").splitlines():
-                target.Out(l.rstrip("\r\n"))
-            target.submit(silence=True)
-            yield Issue(f"Trimmed {type} case {case.name}.", Severity.Info)
+            with stage(f"trim/{type}", case.name) as usage:
+                usage.read = fileSize(case.infile) + fileSize(case.outfile)
+                changed = False
+                for file in (case.infile, case.outfile):
+                    if file is not None and trimFile(file, problem.crlf):
+                        changed = True
+                        usage.written += fileSize(file)
+            if changed:
+                yield Issue(f"Trimmed {type} case {case.name}.", Severity.Info)
+            else:
+                yield Issue(f"The {type} case {case.name} is already trimmed.", Severity.Info)
 
         for case in self.reader.samples():
             yield from item(case, "sample")
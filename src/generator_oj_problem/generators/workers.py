@@ -0,0 +1,164 @@
+import io
+import json
+import os
+import subprocess
+import sys
+import threading
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from types import CodeType
+from typing import Tuple
+
+from .. import generators
+from ..profiling import cpuTime
+from . import Case
+from .captures import BoundedText, GeneratorResult
+from .limits import Limits, killGroup, limitCpu, signalName
+
+
+class GeneratorWorker:
+    def __init__(self, root: Path, file: Path, limits: "Limits | None" = None) -> None:
+        self.root = root
+        self.file = file
+        self.limits = limits or Limits()
+        self.process: "subprocess.Popen | None" = None
+
+    def _start(self):
+        # The memory limit holds for the whole worker, the CPU limit is set by the worker for each case.
+        self.process = Limits(memory=self.limits.memory).popen([sys.executable, "-u", "-m", __name__, str(self.file)],
+                                                               cwd=self.root,
+                                                               text=True,
+                                                               encoding="utf-8",
+                                                               stdin=subprocess.PIPE,
+                                                               stdout=subprocess.PIPE,
+                                                               start_new_session=True,
+                                                               env={**os.environ, "PYTHONUTF8": "1"})
+
+    def run(self, case: Case) -> GeneratorResult:
+        if self.process is None or self.process.poll() is not None:
+            self._start()
+        args = [str(self.file), str(case.id)]
+
+        # A stuck worker is killed with its whole session, and restarted for the next case.
+        process = self.process
+        lock = threading.Lock()
+        done = timeout = False
+
+        def kill():
+            nonlocal timeout
+            with lock:
+                if not done:
+                    timeout = True
+                    killGroup(process)
+
+        timer = threading.Timer(self.limits.timeout, kill) if self.limits.timeout > 0 else None
+        if timer is not None:
+            timer.start()
+        try:
+            process.stdin.write(json.dumps({
+                "id": str(case.id),
+                "target": str(case.target.resolve()),
+                "rewrite": case.rewrite,
+                "crlf": case.crlf,
+                "stream": case.stream,
+                "cpu": self.limits.cpu,
+            }) + "\n")
+            process.stdin.flush()
+            response = process.stdout.readline()
+        except OSError:
+            response = ""
+        finally:
+            with lock:
+                done = True
+            if timer is not None:
+                timer.cancel()
+
+        if timeout:
+            process.wait()
+            self.process = None
+            raise subprocess.TimeoutExpired(args, self.limits.timeout)
+        if not response:
+            returncode = process.wait()
+            killGroup(process)
+            self.process = None
+            if returncode < 0:
+                return GeneratorResult(returncode, "", f"Generator worker was killed by {signalName(-returncode)}.")
+            return GeneratorResult(returncode or 1, "", "Generator worker exited unexpectedly.")
+        result = json.loads(response)
+        return GeneratorResult(result["returncode"], result["stdout"], result["stderr"], result["submission"], result.get("cpu"))
+
+    def close(self):
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        self.process.wait()
+        self.process = None
+
+
+def loadGenerator(file: Path) -> CodeType:
+    # Prepare this process to run the generator repeatedly, as if it was the main script.
+    sys.argv = [str(file)]
+    sys.path.insert(0, str(file.parent))
+    return compile(file.read_text(encoding="utf-8"), str(file), "exec")
+
+
+def runGenerator(code: CodeType, file: Path, case: Case) -> "Tuple[int, str, str]":
+    # Run the generator in this process with `case` as its data, and return the exit code and outputs.
+    generators.data = case
+    stdout, stderr = BoundedText(), BoundedText()
+    returncode = 0
+    sys.stdin = io.StringIO()
+    with redirect_stdout(stdout), redirect_stderr(stderr):
+        try:
+            exec(code, {"__name__": "__main__", "__file__": str(file)})
+        except SystemExit as ex:
+            if ex.code is None or isinstance(ex.code, int):
+                returncode = ex.code or 0
+            else:
+                print(ex.code, file=sys.stderr)
+                returncode = 1
+        except Exception:
+            traceback.print_exc()
+            returncode = 1
+    return returncode, stdout.getvalue(), stderr.getvalue()
+
+
+def serve(file: Path):
+    code = loadGenerator(file)
+
+    # Keep private copies of the protocol pipes, since the generator may
+    # close stdin (e.g. by `exit()`) or write to the stdout descriptor.
+    requests = os.fdopen(os.dup(0), "r", encoding="utf-8")
+    responses = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    os.dup2(2, 1)
+
+    # Submissions are read from the case after each run, instead of being reported.
+    generators.reporter = lambda submission: None
+
+    for line in requests:
+        request = json.loads(line)
+        case = Case(request["id"], Path(request["target"]),
+                    rewrite=request["rewrite"], crlf=request["crlf"], stream=request["stream"])
+
+        limitCpu(request.get("cpu", 0))
+        cpu = cpuTime()
+        returncode, stdout, stderr = runGenerator(code, file, case)
+        cpu = cpuTime() - cpu
+        limitCpu(0)
+
+        responses.write(json.dumps({
+            "returncode": returncode,
+            "stdout": stdout,
+            "stderr": stderr,
+            "submission": case.submission,
+            "cpu": cpu,
+        }) + "\n")
+        responses.flush()
+
+
+if __name__ == "__main__":
+    serve(Path(sys.argv[1]))
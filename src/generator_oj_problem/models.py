@@ -1,5 +1,27 @@
+from contextlib import contextmanager
 from dataclasses import dataclass, field
 from enum import IntEnum
+import mmap
+from pathlib import Path
+from typing import ContextManager, Iterator, Tuple
+
+EOL_CHUNK = 16 * 1024 * 1024
+
+
+def countEol(raw: "bytes | mmap.mmap") -> "Tuple[int, int, int]":
+    # Returns the numbers of LF (not in CRLF), CRLF and bare CR.
+    # Count in bounded chunks, since mmap has no count().
+    lfs = crs = crlfs = 0
+    last = b""
+    for start in range(0, len(raw), EOL_CHUNK):
+        chunk = raw[start:start + EOL_CHUNK]
+        lfs += chunk.count(b"\n")
+        crs += chunk.count(b"\r")
+        crlfs += chunk.count(b"\r\n")
+        if last == b"\r" and chunk[:1] == b"\n":
+            crlfs += 1
+        last = chunk[-1:]
+    return lfs - crlfs, crlfs, crs - crlfs
 
 
 class Severity(IntEnum):
@@ -14,19 +36,80 @@ class Issue:
     level: Severity = Severity.Info
 
 
-@dataclass
 class TestCase:
-    name: str = ""
-    rinput: bytes = b""
-    routput: bytes = b""
+    __slots__ = ("name", "infile", "outfile", "_rinput", "_routput", "_input", "_output")
+
+    def __init__(self, name: str = "", rinput: "bytes | None" = None, routput: "bytes | None" = None, infile: "Path | None" = None, outfile: "Path | None" = None) -> None:
+        self.name = name
+        # Raw data given in memory, or None to read them lazily from the files.
+        # The decoded texts are cached until the raw data are reassigned.
+        self._rinput = rinput
+        self._routput = routput
+        self.infile = infile
+        self.outfile = outfile
+        self._input: "str | None" = None
+        self._output: "str | None" = None
+
+    def __repr__(self) -> str:
+        return f"TestCase(name={self.name!r}, infile={self.infile!r}, outfile={self.outfile!r})"
+
+    @staticmethod
+    def _raw(data: "bytes | None", file: "Path | None") -> bytes:
+        if data is not None:
+            return data
+        if file is None or not file.exists():
+            return b""
+        return file.read_bytes()
+
+    # Large files are memory-mapped instead of being read into memory.
+    @staticmethod
+    @contextmanager
+    def _view(data: "bytes | None", file: "Path | None") -> "Iterator[bytes | mmap.mmap]":
+        if data is not None:
+            yield data
+        elif file is None or not file.exists() or file.stat().st_size == 0:
+            yield b""
+        else:
+            with open(file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                yield mm
+
+    @property
+    def rinput(self) -> bytes:
+        return self._raw(self._rinput, self.infile)
+
+    @rinput.setter
+    def rinput(self, value: "bytes | None"):
+        self._rinput = value
+        self._input = None
+
+    @property
+    def routput(self) -> bytes:
+        return self._raw(self._routput, self.outfile)
+
+    @routput.setter
+    def routput(self, value: "bytes | None"):
+        self._routput = value
+        self._output = None
+
+    def viewInput(self) -> "ContextManager[bytes | mmap.mmap]":
+        return self._view(self._rinput, self.infile)
+
+    def viewOutput(self) -> "ContextManager[bytes | mmap.mmap]":
+        return self._view(self._routput, self.outfile)
 
     @property
-    def input(self):
-        return self.rinput.decode("utf-8")
+    def input(self) -> str:
+        if self._input is None:
+            with self.viewInput() as raw:
+                self._input = str(raw, "utf-8")
+        return self._input
 
     @property
-    def output(self):
-        return self.routput.decode("utf-8")
+    def output(self) -> str:
+        if self._output is None:
+            with self.viewOutput() as raw:
+                self._output = str(raw, "utf-8")
+        return self._output
 
 
 @dataclass
@@ -38,6 +121,10 @@ class Problem:
     solution: str = ""
     solutionLanguage: str = "C++"
     crlf: bool = False
+    # Limits of each generator run, 0 for no limit.
+    generatorTimeout: float = 0.0
+    generatorTime: float = 0.0
+    generatorMemory: float = 0.0
 
     description: str = ""
     input: str = ""
@@ -4,6 +4,8 @@ from typing import Iterable
 
 from .models import Issue, Problem, Severity, TestCase
 from . import getWorkingDirectory
+from .caches import Manifest, getManifest
+from .profiling import profiled, stage
 
 
 class Initializer:
@@ -21,6 +23,12 @@ class Reader:
     def tests(self) -> Iterable[TestCase]:
         pass
 
+    def orphans(self) -> Iterable[Path]:
+        return []
+
+    def files(self) -> Iterable[Path]:
+        return []
+
 
 class Loader:
     def build(self, root: Path) -> Reader:
@@ -28,38 +36,43 @@ class Loader:
 
 
 class Checker:
-    def check(self, reader: Reader) -> "Iterable[Issue]":
+    def check(self, reader: Reader, jobs: int = 1, cache: "Manifest | None" = None) -> "Iterable[Issue]":
         pass
 
 
 class Packer:
-    def pack(self, reader: Reader, dist: Path) -> "Iterable[Issue]":
+    def pack(self, reader: Reader, dist: Path, compression: "str | None" = None, level: "int | None" = None) -> "Iterable[Issue]":
         pass
 
 
 class Pipeline:
-    def __init__(self, initializer: "Initializer | None", loader: "Loader | None", checker: "Checker | None", packer: "Packer | None") -> None:
+    def __init__(self, initializer: "Initializer | None", loader: "Loader | None", checker: "Checker | None", packer: "Packer | None", root: "Path | None" = None) -> None:
         self.initializer = initializer
         self.loader = loader
         self.checker = checker
         self.packer = packer
-        self.root = getWorkingDirectory()
+        self.root = root or getWorkingDirectory()
 
     def initialize(self):
         if self.initializer is None:
             yield Issue("The initializer is disabled.", Severity.Error)
         else:
-            yield from self.initializer.initialize(self.root)
+            yield from profiled("initialize", self.initializer.initialize(self.root))
 
-    def check(self):
+    def check(self, jobs: int = 1, cache: bool = True):
         if self.loader is None:
             yield Issue("The loader is disabled.", Severity.Error)
         elif self.checker is None:
             yield Issue("The checker is disabled.", Severity.Error)
         else:
-            yield from self.checker.check(self.loader.build(self.root))
-
-    def pack(self):
+            manifest = getManifest(self.root) if cache else None
+            try:
+                yield from profiled("check", self.checker.check(self.loader.build(self.root), jobs, manifest))
+            finally:
+                if manifest:
+                    manifest.save()
+
+    def pack(self, cache: bool = True, compression: "str | None" = None, level: "int | None" = None):
         if self.loader is None:
             yield Issue("The loader is disabled.", Severity.Error)
         elif self.packer is None:
@@ -68,18 +81,68 @@ class Pipeline:
             dist = self.root / "dist"
             if not dist.exists() or dist.is_file():
                 os.makedirs(dist)
-            yield from self.packer.pack(self.loader.build(self.root), dist)
-
-    def generate(self, start: int, count: int, sample: bool = False, rewrite: bool = False):
+            reader = self.loader.build(self.root)
+            if not cache:
+                yield from profiled("pack", self.packer.pack(reader, dist, compression, level))
+                return
+
+            # Skip packing if neither the sources nor the packed files changed since the last run.
+            manifest = getManifest(self.root)
+            key = f"pack/{type(self.packer).__module__}.{type(self.packer).__qualname__}"
+
+            def packed():
+                return manifest.fingerprint(sorted(file for file in dist.iterdir() if file.is_file()))
+
+            with stage("pack/fingerprint"):
+                fingerprint = manifest.fingerprint(
+                    sorted(reader.files()), key, str(compression), str(level))
+                cached = manifest.get(key, fingerprint)
+                previous = manifest.get(f"{key}/dist", packed())
+            if cached is not None and previous is not None:
+                yield from cached
+                yield Issue("Nothing changed since the last packing, skipped.")
+                return
+
+            issues = []
+            for item in profiled("pack", self.packer.pack(reader, dist, compression, level)):
+                issues.append(item)
+                yield item
+            if max((item.level for item in issues), default=Severity.Info) < Severity.Error:
+                manifest.put(key, fingerprint, issues)
+                manifest.put(f"{key}/dist", packed(), [])
+                manifest.save()
+
+    def generate(self, start: int, count: int, sample: bool = False, rewrite: bool = False, jobs: int = 1, persistent: bool = False, stream: bool = False, timeout: "float | None" = None, cpu: "float | None" = None, memory: "float | None" = None):
         if self.loader is None:
             yield Issue("The loader is disabled.", Severity.Error)
         else:
             from generator_oj_problem.generators.processors import TestGenerator
-            yield from TestGenerator(self.root, self.loader.build(self.root)).generate(start, count, sample, rewrite)
+            yield from profiled("generate", TestGenerator(self.root, self.loader.build(self.root)).generate(start, count, sample, rewrite, jobs, persistent, stream, timeout, cpu, memory))
 
     def trim(self):
         if self.loader is None:
             yield Issue("The loader is disabled.", Severity.Error)
         else:
             from generator_oj_problem.generators.trimmers import TestTrimmer
-            yield from TestTrimmer(self.root, self.loader.build(self.root)).trim()
+            yield from profiled("trim", TestTrimmer(self.root, self.loader.build(self.root)).trim())
+
+    def solve(self, jobs: int = 1, rewrite: bool = False, timeout: float = 10.0):
+        if self.loader is None:
+            yield Issue("The loader is disabled.", Severity.Error)
+        else:
+            from generator_oj_problem.generators.solvers import TestSolver
+            yield from profiled("solve", TestSolver(self.root, self.loader.build(self.root)).solve(jobs, rewrite, timeout))
+
+    def measure(self, repeat: int = 1, jobs: int = 1):
+        if self.loader is None:
+            yield Issue("The loader is disabled.", Severity.Error)
+        else:
+            from generator_oj_problem.generators.measurers import TestMeasurer
+            yield from profiled("measure", TestMeasurer(self.root, self.loader.build(self.root)).measure(repeat, jobs))
+
+    def stress(self, brute: Path, count: int = 1000, jobs: int = 1, seed: "int | None" = None, timeout: float = 10.0):
+        if self.loader is None:
+            yield Issue("The loader is disabled.", Severity.Error)
+        else:
+            from generator_oj_problem.generators.stressers import TestStresser
+            yield from profiled("stress", TestStresser(self.root, self.loader.build(self.root)).stress(brute, count, jobs, seed, timeout))
@@ -0,0 +1,153 @@
+from contextlib import contextmanager
+import json
+import os
+from pathlib import Path
+from threading import Lock
+import time
+from typing import Dict, Iterable, Iterator, List, TypeVar
+
+T = TypeVar("T")
+
+
+def cpuTime() -> float:
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+class Usage:
+    __slots__ = ("read", "written", "cpu")
+
+    def __init__(self) -> None:
+        self.read = 0
+        self.written = 0
+        # CPU time measured by the stage itself, e.g. from the rusage of its child process.
+        self.cpu: "float | None" = None
+
+
+class StageRecord:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu: "float | None" = 0.0
+        self.read = 0
+        self.written = 0
+        self.cases = 0
+
+    def add(self, wall: float, cpu: "float | None", usage: Usage, case: bool):
+        self.calls += 1
+        self.wall += wall
+        # The total is unknown once the CPU time of any call is.
+        self.cpu = None if cpu is None or self.cpu is None else self.cpu + cpu
+        self.read += usage.read
+        self.written += usage.written
+        if case:
+            self.cases += 1
+
+
+class Profiler:
+    def __init__(self) -> None:
+        self.stages: "Dict[str, StageRecord]" = {}
+        self.cases: "List[dict]" = []
+        # Stages may be recorded from generator threads.
+        self.lock = Lock()
+        # Case stages running now and started so far, to find those overlapping with others.
+        self.running = 0
+        self.started = 0
+
+    def record(self, name: str, wall: float, cpu: "float | None", usage: Usage, case: "str | None" = None):
+        with self.lock:
+            record = self.stages.get(name)
+            if record is None:
+                record = self.stages[name] = StageRecord()
+            record.add(wall, cpu, usage, case is not None)
+            if case is not None:
+                self.cases.append({"stage": name, "case": case, "wall": wall, "cpu": cpu,
+                                   "read": usage.read, "written": usage.written})
+
+    @contextmanager
+    def stage(self, name: str, case: "str | None" = None) -> "Iterator[Usage]":
+        usage = Usage()
+        if case is not None:
+            with self.lock:
+                self.running += 1
+                self.started += 1
+                started, shared = self.started, self.running > 1
+        wall, cpu = time.perf_counter(), cpuTime()
+        try:
+            yield usage
+        finally:
+            wall, cpu = time.perf_counter() - wall, cpuTime() - cpu
+            if case is not None:
+                with self.lock:
+                    self.running -= 1
+                    shared = shared or self.started != started
+                # The process-wide CPU time can not be split between concurrent cases,
+                #   so it is only recorded for cases that run alone or measure it themselves.
+                if shared:
+                    cpu = None
+            if usage.cpu is not None:
+                cpu = usage.cpu
+            self.record(name, wall, cpu, usage, case)
+
+    def summary(self) -> "Iterable[str]":
+        width = max([len("Stage"), *map(len, self.stages)])
+        yield f"{'Stage':<{width}}  {'Calls':>6}  {'Cases':>6}  {'Wall (s)':>9}  {'CPU (s)':>9}  {'Read (MB)':>10}  {'Written (MB)':>12}"
+        for name, item in self.stages.items():
+            cpu = "-" if item.cpu is None else f"{item.cpu:.3f}"
+            yield f"{name:<{width}}  {item.calls:>6}  {item.cases:>6}  {item.wall:>9.3f}  {cpu:>9}  {item.read / 1024 / 1024:>10.2f}  {item.written / 1024 / 1024:>12.2f}"
+        if any(item.cpu is None for item in self.stages.values()):
+            yield "CPU time (-) is not recorded for cases run concurrently without their own measurement."
+
+    def dump(self, file: Path):
+        file.write_text(json.dumps({
+            "stages": {name: vars(item) for name, item in self.stages.items()},
+            "cases": self.cases,
+        }, indent=4), encoding="utf-8")
+
+
+profiler: "Profiler | None" = None
+
+
+def enable() -> Profiler:
+    global profiler
+    profiler = Profiler()
+    return profiler
+
+
+@contextmanager
+def stage(name: str, case: "str | None" = None) -> "Iterator[Usage]":
+    if profiler is None:
+        yield Usage()
+    else:
+        with profiler.stage(name, case) as usage:
+            yield usage
+
+
+def profiled(name: str, items: "Iterable[T]") -> "Iterable[T]":
+    # Only the time spent producing items is counted, not the time of the consumer.
+    if profiler is None:
+        yield from items
+        return
+    usage = Usage()
+    wall = cpu = 0.0
+    iterator = iter(items)
+    try:
+        while True:
+            start, startCpu = time.perf_counter(), cpuTime()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                wall += time.perf_counter() - start
+                cpu += cpuTime() - startCpu
+            yield item
+    finally:
+        profiler.record(name, wall, cpu, usage)
+
+
+def fileSize(file: "Path | None") -> int:
+    try:
+        return file.stat().st_size if file is not None else 0
+    except OSError:
+        return 0